@@ -0,0 +1,85 @@
+# async_rag.py
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Protocol, runtime_checkable
+
+
+class LoopLocal:
+    """One value per running event loop, built on first use by ``factory``.
+
+    asyncio primitives belong to the loop they are first used on, so
+    semaphores and task tables are kept per loop; entries go away with
+    their loop.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._values = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                value = self._values[loop] = self.factory()
+            return value
+
+    def values(self):
+        with self._lock:
+            return list(self._values.values())
+
+
+async def pipeline_ready(rag):
+    """Await a lazily loading pipeline (anything with ``wait_async``, e.g. main.LazyRAG) off the loop.
+
+    Attribute access on a pipeline that is still loading blocks until the
+    load finishes, so async callers await this before touching it.
+    """
+    wait_async = getattr(rag, 'wait_async', None)
+    if wait_async is not None:
+        await wait_async()
+
+
+@runtime_checkable
+class AsyncRAG(Protocol):
+    """What the async agent pipeline awaits on"""
+
+    async def generate_doc_async(self, query: str) -> str: ...
+
+
+class AsyncRAGAdapter:
+    """Makes any RAG awaitable, with a concurrency limit and per-call timeout.
+
+    Pipelines that already implement ``generate_doc_async`` /
+    ``query_documents_async`` are awaited directly; blocking ones run on a
+    worker thread so the event loop stays free.  Cancelling the awaiting
+    task returns control at once, although a blocking call that already
+    started on a thread runs to completion in the background.
+    """
+
+    def __init__(self, rag, max_concurrency: int = 8, timeout: Optional[float] = None):
+        self.rag = rag
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphores = LoopLocal(lambda: asyncio.Semaphore(self.max_concurrency))
+
+    async def generate_doc_async(self, query: str, timeout: Optional[float] = None) -> str:
+        return await self._call('generate_doc', query, timeout)
+
+    async def query_documents_async(self, query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call('query_documents', query, timeout)
+
+    async def _call(self, method, query, timeout):
+        await pipeline_ready(self.rag)
+        async with self._semaphores.get():
+            native = getattr(self.rag, f'{method}_async', None)
+            if native is not None:
+                call = native(query)
+            else:
+                call = asyncio.to_thread(getattr(self.rag, method), query)
+            return await asyncio.wait_for(call, timeout if timeout is not None else self.timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
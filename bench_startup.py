@@ -0,0 +1,109 @@
+# bench_startup.py
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds, median over fresh interpreters.  Roughly 2x the slowest entry point import
+# (~115 ms) and 3x the offline demo (~0.13 s) as measured; eager heavy imports are
+# caught separately by HEAVY_MODULES
+IMPORT_BUDGET = 0.25
+DEMO_BUDGET = 0.4
+
+# Must not be loaded just by importing the entry points
+HEAVY_MODULES = ['google.cloud.storage', 'numpy', 'faiss', 'multiprocessing']
+
+ENTRY_POINTS = ['main', 'run_demo', 'legal_agentic_system']
+
+
+def _run(args, env=None):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=HERE, env=env, capture_output=True, text=True)
+    return time.perf_counter() - start, result
+
+
+def import_time(module, runs):
+    """Median wall time of ``python -c 'import module'`` in fresh interpreters"""
+    timings = []
+    for _ in range(runs):
+        elapsed, result = _run(['-c', f'import {module}'])
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+        timings.append(elapsed)
+    return statistics.median(timings)
+
+
+def heavy_imports(module):
+    """Which of HEAVY_MODULES end up in sys.modules after importing ``module``"""
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    _, result = _run(['-c', check])
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def slowest_imports(module, top=5):
+    """Largest cumulative entries from ``python -X importtime``"""
+    _, result = _run(['-X', 'importtime', '-c', f'import {module}'])
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+# The real demo downloads the corpus from GCS; offline mode times startup and request handling only
+DEMO_COMMAND = ['main.py', 'demo', '--offline']
+
+
+def demo_time(runs):
+    """Median wall time of ``python main.py demo --offline`` (the whole cold run, not just imports)"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    timings = []
+    for _ in range(runs):
+        elapsed, result = _run(DEMO_COMMAND, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(DEMO_COMMAND)} failed:\n{result.stderr}")
+        timings.append(elapsed)
+    return statistics.median(timings)
+
+
+def bench(runs=5, import_budget=IMPORT_BUDGET, demo_budget=DEMO_BUDGET):
+    """Print the startup report; returns True when everything is within budget"""
+    print("🚀 Startup benchmark")
+    print("=" * 50)
+    ok = True
+
+    for module in ENTRY_POINTS:
+        elapsed = import_time(module, runs)
+        heavy = heavy_imports(module)
+        status = "✅" if elapsed <= import_budget and not heavy else "❌"
+        ok = ok and status == "✅"
+        print(f"{status} import {module}: {elapsed * 1000:.0f} ms (budget {import_budget * 1000:.0f} ms)")
+        if heavy:
+            print(f"   ⚠️  Eagerly imports: {', '.join(heavy)}")
+
+    print("\n📚 Slowest imports under main (cumulative):")
+    for microseconds, name in slowest_imports('main'):
+        print(f"   {microseconds / 1000:7.1f} ms  {name}")
+
+    elapsed = demo_time(runs)
+    status = "✅" if elapsed <= demo_budget else "❌"
+    ok = ok and status == "✅"
+    print(f"\n{status} python {' '.join(DEMO_COMMAND)}: {elapsed:.2f}s (budget {demo_budget:.2f}s)")
+    return ok
+
+
+def main(argv=None):
+    """Command line entry point: bench_startup.py [runs] [import_budget_s] [demo_budget_s]"""
+    argv = sys.argv[1:] if argv is None else argv
+    runs = int(argv[0]) if len(argv) > 0 else 5
+    import_budget = float(argv[1]) if len(argv) > 1 else IMPORT_BUDGET
+    demo_budget = float(argv[2]) if len(argv) > 2 else DEMO_BUDGET
+    return 0 if bench(runs, import_budget, demo_budget) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# embeddings.py
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Deterministic local embedder: signed feature hashing of words and character trigrams.
+
+    No model download and identical vectors on every machine, which keeps
+    the content-hash cache valid across hosts.  Swap in any object with the
+    same ``model_id`` / ``dim`` / ``encode`` interface for a real encoder.
+    """
+
+    def __init__(self, dim=384, char_ngram=3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.model_id = f"hashing-v1-{dim}-{char_ngram}"
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], 'little') % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign * weight
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _features(self, text):
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            yield f"w:{word}", 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - self.char_ngram + 1):
+                yield f"c:{padded[i:i + self.char_ngram]}", 0.5
+
+
+class EmbeddingCache:
+    """Local SQLite store of vectors keyed by (embedder, content hash)"""
+
+    def __init__(self, path='embedding_cache.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_id, text):
+        return hashlib.sha256(f"{model_id}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys, dim):
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if vector.shape[0] == dim:
+                        found[key] = vector
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class MicroBatcher:
+    """Collects encode requests arriving within ``window`` seconds and encodes them together"""
+
+    def __init__(self, encode_fn, window=0.005, max_batch=32):
+        self.encode_fn = encode_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.encoded = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True, name='query-encoder')
+        self._worker.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, stop on the next loop
+                    break
+                batch.append(item)
+            self._encode(batch)
+
+    def _encode(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))  # identical queries encoded once
+        try:
+            vectors = dict(zip(texts, self.encode_fn(texts)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.encoded += len(texts)
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join(timeout=1)
+
+
+class QueryEncoder:
+    """Per-request query encoding: LRU of recent query vectors in front of a MicroBatcher.
+
+    Exposes the embedder interface (``model_id``, ``dim``, ``encode``) so it
+    can stand in for the raw embedder anywhere queries are encoded.
+    """
+
+    def __init__(self, embedder=None, cache_size=4096, batch_window=0.005, max_batch=32):
+        self.embedder = embedder if embedder is not None else HashingEmbedder()
+        self.model_id = self.embedder.model_id
+        self.dim = self.embedder.dim
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self.embedder.encode, batch_window, max_batch)
+
+    def encode_query(self, text):
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.batcher.submit(text).result()
+        with self._lock:
+            self._cache[text] = vector
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def encode(self, texts):
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = self.encode_query(text)
+        return vectors
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'cached_queries': len(self._cache),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'batches': self.batcher.batches,
+            'avg_batch_size': self.batcher.encoded / self.batcher.batches if self.batcher.batches else 0.0
+        }
+
+    def close(self):
+        self.batcher.close()
+
+
+def document_texts(rag):
+    """Text to embed for every document of an ImprovedLegalRAG-style pipeline"""
+    texts = []
+    for doc_id, doc in enumerate(rag.documents):
+        # Memory-bounded pipelines keep answers out of the document dicts
+        answer = doc['answer'] if 'answer' in doc else rag.body(doc_id)
+        texts.append(f"{doc['name']}\n{answer}")
+    return texts
+
+
+def build_embeddings(texts, embedder=None, cache=None, batch_size=64, max_workers=None):
+    """Embed ``texts``, reusing cached vectors and encoding only new content.
+
+    Missing texts are encoded in batches on a process pool; results are
+    written back to the cache keyed by content hash, so a corpus refresh
+    only pays for templates that were added or edited.
+    """
+    if embedder is None:
+        embedder = HashingEmbedder()
+    if cache is None:
+        cache = EmbeddingCache()
+
+    keys = [EmbeddingCache.key(embedder.model_id, text) for text in texts]
+    cached = cache.get_many(list(set(keys)), embedder.dim)
+
+    # Identical texts are encoded once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    print(f"🧬 Embeddings: {len(texts)} documents, {len(missing)} new or changed to encode")
+
+    if missing:
+        missing_keys = list(missing)
+        batches = [missing_keys[i:i + batch_size] for i in range(0, len(missing_keys), batch_size)]
+        workers = max_workers or os.cpu_count() or 1
+
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                encoded = pool.map(embedder.encode, [[missing[key] for key in batch] for batch in batches])
+                for batch, vectors in zip(batches, encoded):
+                    cache.put_many(zip(batch, vectors))
+                    cached.update(zip(batch, vectors))
+        else:
+            for batch in batches:
+                vectors = embedder.encode([missing[key] for key in batch])
+                cache.put_many(zip(batch, vectors))
+                cached.update(zip(batch, vectors))
+
+    matrix = np.empty((len(texts), embedder.dim), dtype=np.float32)
+    for row, key in enumerate(keys):
+        matrix[row] = cached[key]
+    return matrix
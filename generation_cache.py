@@ -0,0 +1,261 @@
+# generation_cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from rag_bounded import ByteBudgetCache
+from semantic_cache import normalize_query
+
+
+def model_fingerprint(rag):
+    """Hash of the adapter config the pipeline was loaded with (adapter_config.json contents)"""
+    config = getattr(rag, 'config', None)
+    payload = json.dumps(config, sort_keys=True, default=str) if config is not None else type(rag).__name__
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _document_text(rag, doc_id, doc):
+    answer = doc.get('answer')
+    if answer is None and hasattr(rag, 'body'):
+        answer = rag.body(doc_id)  # BoundedLegalRAG keeps answers out of the document dicts
+    return f"{doc.get('name', '')}\0{doc.get('type', '')}\0{answer or ''}\n"
+
+
+def corpus_version(rag):
+    """Explicit ``corpus_version`` if the pipeline has one, else a hash of every document's content"""
+    return CorpusVersion().of(rag)
+
+
+class CorpusVersion:
+    """Incremental corpus_version: only documents appended since the last call are hashed.
+
+    A different documents object (a reload) or a shorter one starts over, so
+    a streaming load is followed batch by batch without rehashing the corpus.
+    """
+
+    def __init__(self):
+        self._documents = None
+        self._count = 0
+        self._digest = hashlib.sha256()
+
+    def of(self, rag):
+        version = getattr(rag, 'corpus_version', None)
+        if version is not None:
+            return str(version)
+
+        documents = getattr(rag, 'documents', None) or []
+        if documents is not self._documents or len(documents) < self._count:
+            self._documents = documents
+            self._count = 0
+            self._digest = hashlib.sha256()
+        for doc_id in range(self._count, len(documents)):
+            self._digest.update(_document_text(rag, doc_id, documents[doc_id]).encode('utf-8'))
+        self._count = len(documents)
+        return self._digest.hexdigest()[:16]
+
+
+class GenerationFingerprint:
+    """Current model config + corpus version of a pipeline, rechecked on every call.
+
+    Unchanged config and documents cost a couple of identity checks; appended
+    documents are hashed incrementally (see CorpusVersion).
+    """
+
+    def __init__(self, rag):
+        self.rag = rag
+        self.value = None
+        self._config = None
+        self._model = None
+        self._corpus = CorpusVersion()
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            config = getattr(self.rag, 'config', None)
+            if self._model is None or config is not self._config:
+                self._config = config
+                self._model = model_fingerprint(self.rag)
+            self.value = f"{self._model}-{self._corpus.of(self.rag)}"
+            return self.value
+
+    def reset(self):
+        """Forget what has been hashed (e.g. after editing documents in place)"""
+        with self._lock:
+            self._config = self._model = None
+            self._corpus = CorpusVersion()
+
+
+class GenerationCache:
+    """Two-tier store of generated documents: in-memory LRU in front of SQLite.
+
+    Entries are keyed by normalised query and tagged with the fingerprint
+    (model config + corpus version) they were generated under, so a new
+    fingerprint simply misses.  Past ``max_disk_bytes`` the disk tier drops
+    rows from other fingerprints first, oldest-used first, then the current
+    fingerprint's own oldest rows.  ``invalidate`` clears explicitly.
+    """
+
+    def __init__(self, path='generation_cache.sqlite', memory_bytes=16 * 1024 * 1024,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = ByteBudgetCache(memory_bytes)
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT, document TEXT, size INTEGER, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(query, fingerprint):
+        return hashlib.sha256(f"{fingerprint}\0{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def get(self, query, fingerprint):
+        key = self.key(query, fingerprint)
+        document = self.memory.get(key)
+        if document is not None:
+            return document
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document FROM generations WHERE key = ? AND fingerprint = ?", (key, fingerprint)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.disk_hits += 1
+        self.memory.put(key, row[0])
+        return row[0]
+
+    def put(self, query, fingerprint, document):
+        key = self.key(query, fingerprint)
+        self.memory.put(key, document)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, fingerprint, document, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, document, len(document.encode('utf-8')), time.time())
+            )
+            self._trim(fingerprint)
+            self._conn.commit()
+
+    def _trim(self, fingerprint):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        evicted = []
+        rows = self._conn.execute(
+            "SELECT key, size FROM generations ORDER BY fingerprint = ?, last_used", (fingerprint,)
+        )
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM generations WHERE key = ?", evicted)
+
+    def invalidate(self, fingerprint=None):
+        """Drop every entry not generated under ``fingerprint`` (all entries if None)"""
+        self.memory.clear()
+        with self._lock:
+            if fingerprint is None:
+                self._conn.execute("DELETE FROM generations")
+            else:
+                self._conn.execute("DELETE FROM generations WHERE fingerprint != ?", (fingerprint,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            disk_entries, disk_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+            ).fetchone()
+        memory = self.memory.stats()
+        return {
+            'memory_entries': memory['entries'],
+            'memory_bytes': memory['bytes'],
+            'memory_hits': self.memory.hits,
+            'disk_entries': disk_entries,
+            'disk_bytes': disk_bytes,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+class CachedGenerator:
+    """Drop-in wrapper that memoizes ``generate_doc`` in a GenerationCache"""
+
+    def __init__(self, rag, cache=None):
+        self.rag = rag
+        self.cache = cache if cache is not None else GenerationCache()
+        # Computed on first use, so wrapping a LazyRAG does not wait for its load
+        self.fingerprints = GenerationFingerprint(rag)
+
+    @property
+    def fingerprint(self):
+        return self.fingerprints.value
+
+    def refresh(self):
+        """Recompute the model/corpus fingerprint from scratch (e.g. after editing documents in place)"""
+        self.fingerprints.reset()
+        return self._current_fingerprint()
+
+    def _current_fingerprint(self):
+        return self.fingerprints.current()
+
+    def generate_doc(self, query):
+        fingerprint = self._current_fingerprint()
+        document = self.cache.get(query, fingerprint)
+        if document is None:
+            document = self.rag.generate_doc(query)
+            self.cache.put(query, fingerprint, document)
+        return document
+
+    def generate_doc_stream(self, query):
+        """Cached documents come back in one piece; misses stream through and are stored at the end"""
+        fingerprint = self._current_fingerprint()
+        document = self.cache.get(query, fingerprint)
+        if document is not None:
+            yield document
+            return
+        stream = getattr(self.rag, 'generate_doc_stream', None)
+        if stream is None:
+            document = self.rag.generate_doc(query)
+            self.cache.put(query, fingerprint, document)
+            yield document
+            return
+        chunks = []
+        for chunk in stream(query):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(query, fingerprint, "".join(chunks))
+
+    async def generate_doc_async(self, query):
+        fingerprint = await asyncio.to_thread(self._current_fingerprint)
+        document = await asyncio.to_thread(self.cache.get, query, fingerprint)
+        if document is None:
+            native = getattr(self.rag, 'generate_doc_async', None)
+            if native is not None:
+                document = await native(query)
+            else:
+                document = await asyncio.to_thread(self.rag.generate_doc, query)
+            await asyncio.to_thread(self.cache.put, query, fingerprint, document)
+        return document
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
@@ -0,0 +1,140 @@
+# keyword_router.py
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Each table is ordered: earlier rows win, exactly like the if/elif chains they replace
+
+INTENT_KEYWORDS = [
+    ("document_generation", ['generate', 'create', 'draft', 'make', 'prepare', 'write']),
+    ("calculation", ['calculate', 'compute', 'how much', 'total', 'sum', 'percentage', '%']),
+    ("comparison", ['compare', 'vs', 'versus', 'difference', 'better', 'pros and cons']),
+    ("analysis", ['analyze', 'review', 'check', 'verify', 'validate', 'assess']),
+]
+
+DOCUMENT_TYPE_KEYWORDS = [
+    ('nda', 'NDA'),
+    ('non-disclosure', 'NDA'),
+    ('confidentiality', 'Confidentiality Agreement'),
+    ('employment', 'Employment Contract'),
+    ('partnership', 'Partnership Agreement'),
+    ('llc', 'LLC Agreement'),
+    ('rental', 'Rental Agreement'),
+    ('lease', 'Lease Agreement'),
+    ('contract', 'Contract'),
+]
+
+SUGGESTION_KEYWORDS = [
+    ("nda", ['nda']),
+    ("rental", ['rental', 'lease']),
+    ("employment", ['employment']),
+]
+
+CALCULATION_KEYWORDS = [
+    ("late_fees", ['late', 'fee', 'rent']),
+    ("percentage", ['%', 'percent', 'percentage']),
+    ("damages", ['damage', 'compensation', 'award']),
+]
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: every keyword occurrence in one pass over the text"""
+
+    def __init__(self, keywords):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(keyword)
+
+        # Breadth-first failure links; outputs inherit their fallback's matches
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, target in self.goto[state].items():
+                pending.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.output[target] = self.output[target] + self.output[self.fail[target]]
+
+    def find_all(self, text):
+        """Set of keywords that occur anywhere in ``text`` (substring semantics, like ``in``)"""
+        found = set()
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class Route(NamedTuple):
+    intent: str
+    document_types: Tuple[str, ...]
+    suggestion: Optional[str]
+    calculation: str
+    keywords: frozenset
+
+
+class KeywordRouter:
+    """All routing decisions for a query from a single automaton pass"""
+
+    def __init__(self):
+        self._intents = self._ranked(INTENT_KEYWORDS)
+        self._suggestions = self._ranked(SUGGESTION_KEYWORDS)
+        self._calculations = self._ranked(CALCULATION_KEYWORDS)
+        self._document_types = {}
+        for rank, (keyword, doc_type) in enumerate(DOCUMENT_TYPE_KEYWORDS):
+            self._document_types.setdefault(keyword, []).append((rank, doc_type))
+
+        keywords = set(self._intents) | set(self._suggestions) | set(self._calculations) | set(self._document_types)
+        self.automaton = KeywordAutomaton(sorted(keywords))
+        self.route = lru_cache(maxsize=4096)(self._route)
+
+    @staticmethod
+    def _ranked(table):
+        ranked = {}
+        for rank, (label, keywords) in enumerate(table):
+            for keyword in keywords:
+                # A keyword listed under several labels routes to the earliest one
+                ranked.setdefault(keyword, (rank, label))
+        return ranked
+
+    @staticmethod
+    def _best(found, ranked, default):
+        hits = [ranked[keyword] for keyword in found if keyword in ranked]
+        return min(hits)[1] if hits else default
+
+    def _route(self, query: str) -> Route:
+        found = frozenset(self.automaton.find_all(query.lower()))
+
+        doc_hits = sorted(hit for keyword in found for hit in self._document_types.get(keyword, ()))
+        return Route(
+            intent=self._best(found, self._intents, "general_query"),
+            document_types=tuple(doc_type for _, doc_type in doc_hits),
+            suggestion=self._best(found, self._suggestions, None),
+            calculation=self._best(found, self._calculations, "general"),
+            keywords=found
+        )
+
+
+ROUTER = KeywordRouter()
+
+
+def route_query(query: str) -> Route:
+    """Cached single-pass routing of ``query`` (intent, document types, suggestion, calculator branch)"""
+    return ROUTER.route(query)
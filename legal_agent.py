@@ -1,18 +1,81 @@
 # agents/legal_agent.py
+import asyncio
 import re
-from typing import Dict, List, Any
-from tools.legal_calculator import LegalCalculator  # ADD THIS IMPORT
+from typing import AsyncIterator, Dict, Iterator, List, Any, Optional
+from legal_calculator import LegalCalculator
+from keyword_router import route_query
+from async_rag import AsyncRAGAdapter, pipeline_ready
+from semantic_cache import normalize_query
+from singleflight import AsyncSingleFlight, SingleFlight
+from generation_cache import CachedGenerator, GenerationFingerprint
+from session_store import DEFAULT_SESSION, SessionStore
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+
+COMPARISON_NOTES = {
+    ("NDA", "Confidentiality Agreement"): {
+        "differences": "NDA is broader for business secrets, Confidentiality Agreement is for specific information",
+        "use_cases": "Use NDA for general business, Confidentiality for specific data sharing"
+    },
+    ("Employment Contract", "Consulting Agreement"): {
+        "differences": "Employment for full-time staff with benefits, Consulting for project-based work",
+        "use_cases": "Employment for permanent roles, Consulting for temporary projects"
+    },
+    ("LLC Agreement", "Partnership Agreement"): {
+        "differences": "LLC provides limited liability protection, Partnership has shared unlimited liability",
+        "use_cases": "LLC for asset protection, Partnership for simple shared business"
+    }
+}
+
+# Words that mark a request as building on the previous turn ("add a non-compete to that")
+FOLLOW_UP_WORDS = {
+    'that', 'it', 'this', 'those', 'these', 'same', 'also', 'too', 'above', 'previous', 'instead', 'now', 'add'
+}
 
 class LegalAgent:
-    def __init__(self, rag_pipeline):
+    def __init__(self, rag_pipeline, max_concurrent_generations=8, session_store=None):
         self.rag = rag_pipeline
+        self.async_rag = AsyncRAGAdapter(rag_pipeline, max_concurrency=max_concurrent_generations)
         self.calculator = LegalCalculator()  # ADD THIS LINE
-        self.conversation_history = []
-        self.session_context = {}
+        self.sessions = session_store if session_store is not None else SessionStore()
         
-    def process_query(self, user_input: str) -> str:
-        """Main agentic processing with intelligent routing"""
+        # Per-document-type generations and summaries shared by all comparisons,
+        # keyed by the same model/corpus fingerprint as the generation cache
+        self._fingerprints = (
+            rag_pipeline.fingerprints if isinstance(rag_pipeline, CachedGenerator)
+            else GenerationFingerprint(rag_pipeline)
+        )
+        self._type_fingerprint = None
+        self._type_documents = {}
+        self._type_summaries = {}
+        self._type_cache_lock = threading.Lock()
+        self._comparison_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='legal-compare')
+        
+        # Identical concurrent requests share one computation
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
         
+    @property
+    def conversation_history(self):
+        """Recent turns of the default session (bounded ring buffer)"""
+        return self.sessions.history(DEFAULT_SESSION)
+    
+    @property
+    def session_context(self):
+        """Context dict of the default session"""
+        return self.sessions.context(DEFAULT_SESSION)
+    
+    def process_query(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """Main agentic processing with intelligent routing"""
+        response = self._flights.do(normalize_query(user_input), self._process_query, user_input)
+        self._record_turn(session_id, user_input, response)
+        return response
+    
+    def _record_turn(self, session_id: Optional[str], user_input: str, response: str):
+        self.sessions.record_turn(session_id or DEFAULT_SESSION, user_input, response,
+                                  intent=self._analyze_intent(user_input))
+    
+    def _process_query(self, user_input: str) -> str:
         # Step 1: Analyze intent and complexity
         intent = self._analyze_intent(user_input)
         complexity = self._assess_complexity(user_input)
@@ -31,30 +94,209 @@ class LegalAgent:
         else:
             return self._handle_general_query(user_input)
     
+    async def process_query_async(self, user_input: str, timeout: Optional[float] = None,
+                                  session_id: Optional[str] = None) -> str:
+        """Async counterpart of process_query: RAG calls are awaited instead of blocking the loop"""
+        flight = self._async_flights.do(normalize_query(user_input), self._process_query_async, user_input)
+        response = await asyncio.wait_for(flight, timeout)
+        self._record_turn(session_id, user_input, response)
+        return response
+    
+    async def _process_query_async(self, user_input: str) -> str:
+        intent = self._analyze_intent(user_input)
+        complexity = self._assess_complexity(user_input)
+        
+        print(f"   📋 Intent: {intent} | Complexity: {complexity}")
+        
+        if intent == "document_generation":
+            print("   📝 Handling document generation...")
+            document = await self.async_rag.generate_doc_async(user_input)
+            return self._document_generation_response(user_input, document)
+        elif intent == "calculation":
+            return self._handle_calculation(user_input)
+        elif intent == "comparison":
+            print("   ⚖️ Handling comparison...")
+            doc_types = list(dict.fromkeys(self._extract_document_types(user_input)))
+            if len(doc_types) < 2:
+                return self._comparison_help(user_input)
+            documents = await asyncio.gather(*(self._type_document_async(doc_type) for doc_type in doc_types))
+            return self._format_comparison(doc_types, documents)
+        elif intent == "analysis":
+            return self._handle_analysis(user_input)
+        else:
+            print("   💭 Handling general query...")
+            document = await self.async_rag.generate_doc_async(user_input)
+            return self._general_query_response(user_input, document)
+    
+    def process_query_stream(self, user_input: str, chunk_size: int = 512,
+                             session_id: Optional[str] = None) -> Iterator[str]:
+        """Streaming process_query: yields response pieces as soon as each one is ready.
+        
+        Document responses open with the header, then stream the document as the
+        RAG produces it (``generate_doc_stream`` when the pipeline has one, else
+        the finished document in ``chunk_size`` pieces), then the analysis and
+        suggestions. Other intents are yielded whole.
+        """
+        pieces = []
+        for piece in self._stream_pieces(user_input, chunk_size):
+            pieces.append(piece)
+            yield piece
+        self._record_turn(session_id, user_input, "".join(pieces))
+    
+    def _stream_pieces(self, user_input: str, chunk_size: int) -> Iterator[str]:
+        intent = self._analyze_intent(user_input)
+        complexity = self._assess_complexity(user_input)
+        
+        print(f"   📋 Intent: {intent} | Complexity: {complexity}")
+        
+        if intent == "document_generation":
+            print("   📝 Handling document generation...")
+            yield self._stream_document_header(user_input)
+            chunks = []
+            for chunk in self._document_chunks(user_input, chunk_size):
+                chunks.append(chunk)
+                yield chunk
+            yield self._stream_document_footer(user_input, "".join(chunks))
+        elif intent == "general_query":
+            print("   💭 Handling general query...")
+            yield self._stream_general_header(user_input)
+            yield from self._document_chunks(user_input, chunk_size)
+            yield self._stream_general_footer()
+        elif intent == "calculation":
+            yield self._handle_calculation(user_input)
+        elif intent == "comparison":
+            yield self._handle_comparison(user_input)
+        else:
+            yield self._handle_analysis(user_input)
+    
+    async def process_query_astream(self, user_input: str, chunk_size: int = 512,
+                                    session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Async-iterator counterpart of process_query_stream"""
+        pieces = []
+        async for piece in self._astream_pieces(user_input, chunk_size):
+            pieces.append(piece)
+            yield piece
+        self._record_turn(session_id, user_input, "".join(pieces))
+    
+    async def _astream_pieces(self, user_input: str, chunk_size: int) -> AsyncIterator[str]:
+        intent = self._analyze_intent(user_input)
+        complexity = self._assess_complexity(user_input)
+        
+        print(f"   📋 Intent: {intent} | Complexity: {complexity}")
+        
+        if intent == "document_generation":
+            print("   📝 Handling document generation...")
+            yield self._stream_document_header(user_input)
+            chunks = []
+            async for chunk in self._document_chunks_async(user_input, chunk_size):
+                chunks.append(chunk)
+                yield chunk
+            yield self._stream_document_footer(user_input, "".join(chunks))
+        elif intent == "general_query":
+            print("   💭 Handling general query...")
+            yield self._stream_general_header(user_input)
+            async for chunk in self._document_chunks_async(user_input, chunk_size):
+                yield chunk
+            yield self._stream_general_footer()
+        else:
+            yield await self._async_flights.do(normalize_query(user_input), self._process_query_async, user_input)
+    
+    def _document_chunks(self, query: str, chunk_size: int) -> Iterator[str]:
+        """Document text in pieces, as early as the pipeline can produce them"""
+        stream = getattr(self.rag, 'generate_doc_stream', None)
+        if stream is not None:
+            yield from stream(query)
+            return
+        document = self.rag.generate_doc(query)
+        for start in range(0, len(document), chunk_size):
+            yield document[start:start + chunk_size]
+    
+    async def _document_chunks_async(self, query: str, chunk_size: int) -> AsyncIterator[str]:
+        await pipeline_ready(self.rag)
+        stream = getattr(self.rag, 'generate_doc_stream', None)
+        if stream is None:
+            document = await self.async_rag.generate_doc_async(query)
+            for start in range(0, len(document), chunk_size):
+                yield document[start:start + chunk_size]
+            return
+        # Pull each chunk on a worker thread so a blocking stream never stalls the loop
+        chunks = stream(query)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    
+    def _stream_document_header(self, query: str) -> str:
+        return f"""
+⚖️ **LEGAL DOCUMENT GENERATED**
+
+🎯 **Your Request**: "{query}"
+
+📄 **Generated Document**:
+"""
+    
+    def _stream_document_footer(self, query: str, document: str) -> str:
+        analysis = self._analyze_generated_document(document, query)
+        suggestions = self._generate_document_suggestions(query)
+        return f"""
+
+{analysis}
+{suggestions}
+
+✅ **Document generation complete!**
+"""
+    
+    def _stream_general_header(self, query: str) -> str:
+        return f"""
+💡 **General Legal Query**
+
+Your question: "{query}"
+
+📚 **Response from Legal Knowledge Base**:
+"""
+    
+    def _stream_general_footer(self) -> str:
+        return """
+
+🏛️ **Note**: This is based on our training across 5,000+ legal documents
+"""
+    
+    def retrieve(self, user_input: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Retrieve documents; follow-ups first re-rank the previous turn's candidates"""
+        session_id = session_id or DEFAULT_SESSION
+        previous = self.sessions.context(session_id).get('last_retrieval')
+        rerank = getattr(self.rag, 'rerank_documents', None)
+        
+        result = None
+        anchor = user_input
+        if previous and previous['candidates'] and rerank is not None and self._is_follow_up(user_input):
+            # The follow-up alone ("add that clause") rarely names the document, so score it with
+            # the last standalone query; chained follow-ups keep that anchor instead of growing it
+            anchor = previous['query']
+            result = rerank(f"{anchor} {user_input}", [doc_id for doc_id, _ in previous['candidates']])
+            if not result['relevant_docs']:
+                result = None
+                anchor = user_input
+        
+        if result is None:
+            search = getattr(self.rag, 'query_documents', None) or self.rag.query_legal_documents
+            result = search(user_input)
+        
+        candidates = result.get('candidates')
+        if candidates is None:
+            candidates = [(doc['doc_id'], doc['score']) for doc in result.get('relevant_docs', []) if 'doc_id' in doc]
+        self.sessions.update_context(session_id, last_retrieval={'query': anchor, 'candidates': candidates})
+        return result
+    
+    def _is_follow_up(self, query: str) -> bool:
+        """Refers back to the last turn and names no new document type"""
+        words = set(normalize_query(query).replace(',', ' ').split())
+        return bool(words & FOLLOW_UP_WORDS) and not route_query(query).document_types
+    
     def _analyze_intent(self, query: str) -> str:
         """Smart intent analysis"""
-        query_lower = query.lower()
-        
-        intent_patterns = {
-            "document_generation": any(word in query_lower for word in [
-                'generate', 'create', 'draft', 'make', 'prepare', 'write'
-            ]),
-            "calculation": any(word in query_lower for word in [
-                'calculate', 'compute', 'how much', 'total', 'sum', 'percentage', '%'
-            ]),
-            "comparison": any(word in query_lower for word in [
-                'compare', 'vs', 'versus', 'difference', 'better', 'pros and cons'
-            ]),
-            "analysis": any(word in query_lower for word in [
-                'analyze', 'review', 'check', 'verify', 'validate', 'assess'
-            ])
-        }
-        
-        for intent, matches in intent_patterns.items():
-            if matches:
-                return intent
-                
-        return "general_query"
+        return route_query(query).intent
     
     def _assess_complexity(self, query: str) -> str:
         """Assess query complexity"""
@@ -84,6 +326,10 @@ class LegalAgent:
         # Use your RAG's intelligence
         document = self.rag.generate_doc(query)
         
+        return self._document_generation_response(query, document)
+    
+    def _document_generation_response(self, query: str, document: str) -> str:
+        """Agentic analysis and formatting of a generated document"""
         # Agentic analysis
         analysis = self._analyze_generated_document(document, query)
         suggestions = self._generate_document_suggestions(query)
@@ -95,7 +341,7 @@ class LegalAgent:
         print("   🧮 Handling calculation with Legal Calculator...")
         
         # Use the actual calculator tool
-        calculation_result = self.calculator.calculate(query)
+        calculation_result = self.calculator.calculate(query, route_query(query))
         
         return f"""
 🧮 **LEGAL CALCULATION RESULT**
@@ -112,13 +358,17 @@ class LegalAgent:
         print("   ⚖️ Handling comparison...")
         
         # Extract document types from query for comparison
-        doc_types = self._extract_document_types(query)
+        doc_types = list(dict.fromkeys(self._extract_document_types(query)))
         
         if len(doc_types) >= 2:
-            comparison = self._compare_documents(doc_types[0], doc_types[1])
+            comparison = self._compare_documents(*doc_types)
             return comparison
         else:
-            return f"""
+            return self._comparison_help(query)
+    
+    def _comparison_help(self, query: str) -> str:
+        """Explain what can be compared when the query names fewer than two documents"""
+        return f"""
 📊 **Document Comparison Request**
 
 Your query: "{query}"
@@ -157,6 +407,10 @@ Your query: "{query}"
         # Use RAG for general knowledge
         document = self.rag.generate_doc(query)
         
+        return self._general_query_response(query, document)
+    
+    def _general_query_response(self, query: str, document: str) -> str:
+        """Format a knowledge-base answer to a general query"""
         return f"""
 💡 **General Legal Query**
 
@@ -170,63 +424,101 @@ Your question: "{query}"
     
     def _extract_document_types(self, query: str) -> List[str]:
         """Extract document types from comparison query"""
-        doc_keywords = {
-            'nda': 'NDA',
-            'non-disclosure': 'NDA', 
-            'confidentiality': 'Confidentiality Agreement',
-            'employment': 'Employment Contract',
-            'partnership': 'Partnership Agreement',
-            'llc': 'LLC Agreement',
-            'rental': 'Rental Agreement',
-            'lease': 'Lease Agreement',
-            'contract': 'Contract'
-        }
+        return list(route_query(query).document_types)
+    
+    def _compare_documents(self, *doc_types: str) -> str:
+        """Compare two or more document types"""
+        # Generate every document concurrently (or reuse earlier generations)
+        futures = [self._type_document_future(doc_type) for doc_type in doc_types]
+        documents = [future.result() for future in futures]
+        
+        return self._format_comparison(doc_types, documents)
+    
+    def _type_key(self, doc_type: str):
+        """(fingerprint, doc_type); entries from an older model or corpus are dropped"""
+        fingerprint = self._fingerprints.current()
+        with self._type_cache_lock:
+            if fingerprint != self._type_fingerprint:
+                self._type_fingerprint = fingerprint
+                self._type_documents.clear()
+                self._type_summaries.clear()
+        return fingerprint, doc_type
+    
+    def _type_document_future(self, doc_type: str) -> Future:
+        """Cached generation of the reference document for one type"""
+        key = self._type_key(doc_type)
+        with self._type_cache_lock:
+            future = self._type_documents.get(key)
+            if future is None:
+                future = self._comparison_pool.submit(self.rag.generate_doc, doc_type)
+                future.add_done_callback(lambda done, key=key: self._forget_failed(key, done))
+                self._type_documents[key] = future
+        return future
+    
+    async def _type_document_async(self, doc_type: str) -> str:
+        key = await asyncio.to_thread(self._type_key, doc_type)
+        with self._type_cache_lock:
+            future = self._type_documents.get(key)
+        if future is not None:
+            return await asyncio.wrap_future(future)
         
-        found_types = []
-        for keyword, doc_type in doc_keywords.items():
-            if keyword in query.lower():
-                found_types.append(doc_type)
-        
-        return found_types
-    
-    def _compare_documents(self, doc_type1: str, doc_type2: str) -> str:
-        """Compare two document types"""
-        # Generate both documents
-        doc1 = self.rag.generate_doc(doc_type1)
-        doc2 = self.rag.generate_doc(doc_type2)
-        
-        comparison_notes = {
-            ("NDA", "Confidentiality Agreement"): {
-                "differences": "NDA is broader for business secrets, Confidentiality Agreement is for specific information",
-                "use_cases": "Use NDA for general business, Confidentiality for specific data sharing"
-            },
-            ("Employment Contract", "Consulting Agreement"): {
-                "differences": "Employment for full-time staff with benefits, Consulting for project-based work",
-                "use_cases": "Employment for permanent roles, Consulting for temporary projects"
-            },
-            ("LLC Agreement", "Partnership Agreement"): {
-                "differences": "LLC provides limited liability protection, Partnership has shared unlimited liability",
-                "use_cases": "LLC for asset protection, Partnership for simple shared business"
-            }
+        document = await self.async_rag.generate_doc_async(doc_type)
+        future = Future()
+        future.set_result(document)
+        with self._type_cache_lock:
+            self._type_documents.setdefault(key, future)
+        return document
+    
+    def _forget_failed(self, key, future: Future):
+        # Failed generations are retried next time instead of being cached
+        if future.exception() is not None:
+            with self._type_cache_lock:
+                if self._type_documents.get(key) is future:
+                    del self._type_documents[key]
+    
+    def _summary_for_type(self, doc_type: str, document: str) -> str:
+        """Cached _summarize_document output per document type"""
+        key = self._type_key(doc_type)
+        summary = self._type_summaries.get(key)
+        if summary is None:
+            summary = self._summarize_document(document)
+            self._type_summaries[key] = summary
+        return summary
+    
+    def _format_comparison(self, doc_types, documents) -> str:
+        """Format a comparison of two or more generated documents"""
+        default_notes = {
+            "differences": "Different legal structures and liability considerations",
+            "use_cases": "Choose based on business needs and legal protection required"
         }
         
-        key = (doc_type1, doc_type2)
-        if key in comparison_notes:
-            notes = comparison_notes[key]
+        if len(doc_types) == 2:
+            notes = self._comparison_notes(doc_types[0], doc_types[1]) or default_notes
         else:
-            notes = {
-                "differences": "Different legal structures and liability considerations",
-                "use_cases": "Choose based on business needs and legal protection required"
-            }
+            # N-way: list every pair we have specific guidance for
+            pair_notes = [
+                (first, second, self._comparison_notes(first, second))
+                for index, first in enumerate(doc_types)
+                for second in doc_types[index + 1:]
+            ]
+            pair_notes = [(first, second, found) for first, second, found in pair_notes if found]
+            if pair_notes:
+                notes = {
+                    key: "\n".join(f"- {first} vs {second}: {found[key]}" for first, second, found in pair_notes)
+                    for key in ("differences", "use_cases")
+                }
+            else:
+                notes = default_notes
+        
+        overviews = "\n\n".join(
+            f"📄 **{doc_type}**:\n{self._summary_for_type(doc_type, document)}"
+            for doc_type, document in zip(doc_types, documents)
+        )
         
         return f"""
-⚖️ **DOCUMENT COMPARISON**: {doc_type1} vs {doc_type2}
-
-📄 **{doc_type1}**:
-{self._summarize_document(doc1)}
+⚖️ **DOCUMENT COMPARISON**: {' vs '.join(doc_types)}
 
-📄 **{doc_type2}**:
-{self._summarize_document(doc2)}
+{overviews}
 
 🔍 **Key Differences**:
 {notes['differences']}
@@ -237,6 +529,10 @@ Your question: "{query}"
 ✅ **Recommendation**: Consult legal counsel to determine the best fit for your situation
 """
     
+    def _comparison_notes(self, doc_type1: str, doc_type2: str) -> Optional[Dict[str, str]]:
+        """Specific guidance for a pair of document types"""
+        return COMPARISON_NOTES.get((doc_type1, doc_type2))
+    
     def _summarize_document(self, document: str) -> str:
         """Create a brief summary of the document"""
         lines = document.split('\n')
@@ -268,11 +564,12 @@ Your question: "{query}"
 """
         
         # Add specific suggestions based on query
-        if 'nda' in query.lower():
+        trigger = route_query(query).suggestion
+        if trigger == "nda":
             suggestions += "\n• Consider confidentiality period and remedy clauses"
-        elif 'rental' in query.lower() or 'lease' in query.lower():
+        elif trigger == "rental":
             suggestions += "\n• Verify security deposit and maintenance responsibilities"
-        elif 'employment' in query.lower():
+        elif trigger == "employment":
             suggestions += "\n• Review non-compete and termination conditions"
             
         return suggestions
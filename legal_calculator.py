@@ -1,4 +1,5 @@
 import re
+from keyword_router import route_query
 
 class LegalCalculator:
     def __init__(self):
@@ -6,14 +7,15 @@ class LegalCalculator:
             "late_fees", "percentage", "damages", "interest", "penalties"
         ]
     
-    def calculate(self, query: str) -> str:
+    def calculate(self, query: str, route=None) -> str:
         """Main calculation router"""
         try:
-            if any(term in query.lower() for term in ['late', 'fee', 'rent']):
+            calculation = (route or route_query(query)).calculation
+            if calculation == "late_fees":
                 return self._calculate_late_fee(query)
-            elif any(term in query.lower() for term in ['%', 'percent', 'percentage']):
+            elif calculation == "percentage":
                 return self._calculate_percentage(query)
-            elif any(term in query.lower() for term in ['damage', 'compensation', 'award']):
+            elif calculation == "damages":
                 return self._calculate_damages(query)
             else:
                 return self._calculate_general(query)
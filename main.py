@@ -1,32 +1,102 @@
 # main.py - CORRECTED VERSION
-from agents.legal_agent import LegalAgent
-from tools.legal_calculator import LegalCalculator
+from legal_agent import LegalAgent
+from legal_calculator import LegalCalculator
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
 import time
 
-# FIXED IMPORT - Use the correct class name from your rag_final.py
-from rag_final import ImprovedLegalRAG
+from async_rag import LoopLocal
+from scheduler import ComplexityScheduler
+
+# Pipelines, caches and process pools are imported where they are first used,
+# so demo and calculator runs start without them (see bench_startup.py)
+
+class LazyRAG:
+    """RAG pipeline that loads on a background thread.
+    
+    Attribute access waits for the load to finish, so only requests that
+    actually use the pipeline block on it (async code awaits ``wait_async``
+    first, see async_rag.pipeline_ready). If the loader returns None the
+    proxy falls back to ``fallback`` (the demo mock inside LegalAISystem).
+    """
+    
+    def __init__(self, loader, fallback=None):
+        self.fallback = fallback
+        self._loader = loader
+        self._rag = None
+        self._loaded = threading.Event()
+        self._thread = threading.Thread(target=self._load, daemon=True, name='rag-loader')
+        self._thread.start()
+    
+    def _load(self):
+        try:
+            self._rag = self._loader()
+        except Exception as e:
+            print(f"❌ Background RAG load failed: {e}")
+        finally:
+            self._loaded.set()
+    
+    def ready(self):
+        return self._loaded.is_set()
+    
+    def wait(self, timeout=None):
+        """The loaded pipeline (or the fallback if loading failed)"""
+        if not self._loaded.wait(timeout):
+            raise TimeoutError(f"RAG pipeline still loading after {timeout}s")
+        return self._rag if self._rag is not None else self.fallback
+    
+    async def wait_async(self, timeout=None):
+        """wait() for event loops: the load is awaited on a worker thread, never on the loop"""
+        if self.ready():
+            return self.wait()
+        return await asyncio.to_thread(self.wait, timeout)
+    
+    def __getattr__(self, name):
+        return getattr(self.wait(), name)
 
 class LegalAISystem:
-    def __init__(self, rag_pipeline=None):
+    def __init__(self, rag_pipeline=None, max_in_flight=256, generation_cache=None, scheduler=None):
         # Use real RAG if provided, otherwise create mock for demo
-        if rag_pipeline:
+        if isinstance(rag_pipeline, LazyRAG):
+            if rag_pipeline.fallback is None:
+                rag_pipeline.fallback = self._create_mock_rag()
+            self.rag = rag_pipeline
+            self.rag_available = True
+        elif rag_pipeline:
             self.rag = rag_pipeline
             self.rag_available = True
         else:
             self.rag = self._create_mock_rag()
             self.rag_available = False
+        
+        self._lazy_rag = rag_pipeline if isinstance(rag_pipeline, LazyRAG) else None
+        
+        # Memoize document generation (see generation_cache.GenerationCache)
+        if generation_cache is not None:
+            from generation_cache import CachedGenerator
+            self.rag = CachedGenerator(self.rag, generation_cache)
             
         self.agent = LegalAgent(self.rag)
         self.calculator = LegalCalculator()
+        self.scheduler = scheduler if scheduler is not None else ComplexityScheduler()
+        self.max_in_flight = max_in_flight
+        self._request_slots = LoopLocal(lambda: asyncio.Semaphore(self.max_in_flight))
         
         print("⚖️ Legal Agentic AI System Initialized!")
-        if self.rag_available:
+        if self._rag_loading():
+            print("   🔄 RAG loading in background - calculations are available now")
+        elif self.rag_available:
             print("   ✅ Powered by REAL RAG with 5,069 legal documents")
         else:
             print("   ⚠️  Using DEMO MODE - RAG system not connected")
         print("   - Agentic reasoning with multi-tool capabilities")
         print("   - Ready for complex legal document generation\n")
     
+    def _rag_loading(self):
+        return self._lazy_rag is not None and not self._lazy_rag.ready()
+    
     def _create_mock_rag(self):
         """Create mock RAG for demo purposes"""
         class MockRAG:
@@ -60,12 +130,14 @@ KEY SECTIONS:
                 }
         return MockRAG()
     
-    def process_request(self, user_input):
+    def process_request(self, user_input, session_id=None):
         """Main entry point for all legal requests"""
         print(f"🧠 Processing: {user_input}")
         
-        # DEBUG: Show if we're using real RAG
-        if hasattr(self.rag, 'documents'):
+        # DEBUG: Show if we're using real RAG (without waiting on a background load)
+        if self._rag_loading():
+            print("🔍 MODE: REAL RAG (still loading in background)")
+        elif hasattr(self.rag, 'documents'):
             print(f"🔍 MODE: REAL RAG with {len(self.rag.documents)} documents")
         else:
             print("🔍 MODE: DEMO (mock responses)")
@@ -74,8 +146,9 @@ KEY SECTIONS:
         
         start_time = time.time()
         
-        # Let the agent decide how to handle this request
-        response = self.agent.process_query(user_input)
+        # Let the agent decide how to handle this request (cheap ones skip the generation queue)
+        intent, complexity = self._classify(user_input)
+        response = self.scheduler.run(intent, complexity, self.agent.process_query, user_input, session_id)
         
         end_time = time.time()
         
@@ -83,11 +156,85 @@ KEY SECTIONS:
         print("=" * 60)
         
         return response
+    
+    def search(self, user_input, session_id=None):
+        """Document retrieval; follow-up questions reuse the session's previous candidates"""
+        return self.agent.retrieve(user_input, session_id)
+    
+    async def process_request_async(self, user_input, timeout=None, session_id=None):
+        """Async entry point: many requests can be in flight on one event loop"""
+        async with self._request_slots.get():
+            start_time = time.time()
+            try:
+                intent, complexity = self._classify(user_input)
+                response = await self.scheduler.run_async(intent, complexity, self.agent.process_query_async,
+                                                          user_input, timeout, session_id)
+            except asyncio.TimeoutError:
+                response = f"❌ Request timed out after {timeout}s"
+            print(f"⏱️  [async] {user_input[:40]!r} took {time.time() - start_time:.2f}s")
+            return response
+    
+    def _classify(self, user_input):
+        return self.agent._analyze_intent(user_input), self.agent._assess_complexity(user_input)
+    
+    def process_batch(self, queries, max_workers=None, use_processes=False):
+        """Process many requests concurrently.
+        
+        Identical queries are computed once. Results come back in input order
+        as {'query', 'response', 'error'} dicts, so one failure never sinks the batch.
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        print(f"📦 Processing batch of {len(queries)} requests ({len(unique_queries)} unique, {max_workers} workers)")
+        
+        start_time = time.time()
+        
+        if use_processes:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            
+            # Fork where available so workers inherit the loaded agent instead of unpickling it
+            fork = 'fork' in multiprocessing.get_all_start_methods()
+            pool = ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=multiprocessing.get_context('fork') if fork else None,
+                                       initializer=_init_batch_worker, initargs=(self.agent,))
+            run = _run_batch_query
+        else:
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='legal-batch')
+            run = self.agent.process_query
+        
+        with pool:
+            futures = {query: pool.submit(run, query) for query in unique_queries}
+            results = {}
+            for query, future in futures.items():
+                try:
+                    results[query] = {'query': query, 'response': future.result(), 'error': None}
+                except Exception as e:
+                    results[query] = {'query': query, 'response': None, 'error': f"{type(e).__name__}: {e}"}
+        
+        failed = sum(1 for result in results.values() if result['error'])
+        print(f"⏱️  Batch time: {time.time() - start_time:.2f}s ({failed} failed)")
+        
+        return [dict(results[query]) for query in queries]
 
-def initialize_with_real_rag():
+_batch_agent = None
+
+def _init_batch_worker(agent):
+    global _batch_agent
+    _batch_agent = agent
+
+def _run_batch_query(query):
+    return _batch_agent.process_query(query)
+
+def initialize_with_real_rag(streaming=False):
     """Initialize with REAL RAG system"""
     print("🔄 Initializing REAL RAG Pipeline...")
     try:
+        if streaming:
+            return initialize_streaming_rag()
+        # FIXED IMPORT - Use the correct class name from your rag_final.py
+        from rag_final import ImprovedLegalRAG
+        
         rag_system = ImprovedLegalRAG()
         if rag_system.load_final():
             print("✅ REAL RAG Pipeline successfully loaded!")
@@ -99,9 +246,23 @@ def initialize_with_real_rag():
         print(f"❌ Error initializing RAG: {e}")
         return None
 
+def initialize_streaming_rag(ready_timeout=60):
+    """Start streaming the corpus and return as soon as the first batches are indexed"""
+    from rag_streaming import StreamingLegalRAG
+
+    rag_system = StreamingLegalRAG()
+    if not rag_system.load_streaming():
+        print("❌ Failed to start streaming RAG pipeline, using demo mode")
+        return None
+    if not rag_system.wait_until_ready(ready_timeout) or not rag_system.documents:
+        print("❌ No documents streamed in time, using demo mode")
+        return None
+    print(f"✅ REAL RAG Pipeline partially ready ({len(rag_system.documents)} documents so far)")
+    return rag_system
+
 def main():
-    # Try to initialize with real RAG first
-    rag_pipeline = initialize_with_real_rag()
+    # Load the real RAG in the background; calculator requests don't wait for it
+    rag_pipeline = LazyRAG(initialize_with_real_rag)
     
     # Create the agentic system
     legal_ai = LegalAISystem(rag_pipeline)
@@ -123,9 +284,10 @@ def main():
         response = legal_ai.process_request(user_input)
         print(f"\n{response}")
 
-def demo_mode():
-    """Run a quick demo with sample queries"""
-    rag_pipeline = initialize_with_real_rag()
+def demo_mode(offline=False):
+    """Run a quick demo with sample queries (``offline`` answers from the built-in mock corpus, no GCS)"""
+    # The real pipeline still downloads from GCS; the first document request waits for it
+    rag_pipeline = None if offline else LazyRAG(initialize_with_real_rag)
     legal_ai = LegalAISystem(rag_pipeline)
     
     demo_queries = [
@@ -148,6 +310,9 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
-        demo_mode()
+        demo_mode(offline="--offline" in sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from prefork_server import serve
+        serve(sys.argv[2:])
     else:
         main()
\ No newline at end of file
@@ -0,0 +1,155 @@
+# prefork_server.py
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+
+from main import LegalAISystem, initialize_with_real_rag
+from rag_shared import publish_final
+
+
+class PreforkLegalServer:
+    """Pre-fork server: load the RAG once, then fork N workers sharing it.
+
+    The parent packs the corpus into a single shared buffer, freezes the
+    heap with ``gc.freeze()`` and only then forks, so refcount and GC
+    traffic in the workers no longer dirties the pages holding the corpus.
+
+    Protocol: one JSON object per line, ``{"query": "...", "session_id": "..."}``
+    in (``session_id`` optional), ``{"response": "..."}`` or ``{"error": "..."}``
+    out (with ``"status_code": 429`` when the scheduler sheds load).
+    Sessions live in the worker that served them.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, workers=4, rag_pipeline=None):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.rag = rag_pipeline
+        self.store = None
+        self.system = None
+        self.listener = None
+        self.workers = {}
+        self.running = False
+
+    def preload(self):
+        """Load everything workers need before the first fork"""
+        # Keep the collector from copying objects around while we build the heap
+        gc.disable()
+
+        if self.rag is None:
+            self.rag = initialize_with_real_rag()
+        if self.rag is not None and hasattr(self.rag, 'documents'):
+            self.store = publish_final(self.rag)
+
+        self.system = LegalAISystem(self.rag)
+
+        gc.collect()
+        gc.freeze()
+        print(f"🧊 Heap frozen with {gc.get_freeze_count():,} objects before fork")
+
+    def serve_forever(self):
+        """Bind, fork the workers and supervise them until interrupted"""
+        if self.system is None:
+            self.preload()
+
+        self.listener = socket.create_server((self.host, self.port), backlog=128)
+        self.running = True
+        signal.signal(signal.SIGTERM, self._handle_shutdown)
+        signal.signal(signal.SIGINT, self._handle_shutdown)
+
+        print(f"🚀 Pre-fork server listening on {self.host}:{self.port} with {self.num_workers} workers")
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+
+        try:
+            while self.running:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                if pid in self.workers and self.running:
+                    print(f"⚠️  Worker {pid} exited (status {status}), respawning")
+                    del self.workers[pid]
+                    self._spawn_worker()
+        finally:
+            self._shutdown()
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = True
+            return
+
+        # ---------- child ----------
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        gc.enable()
+        code = 0
+        try:
+            self._worker_loop()
+        except Exception as e:
+            print(f"❌ Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _worker_loop(self):
+        print(f"   👷 Worker {os.getpid()} ready")
+        while True:
+            conn, _ = self.listener.accept()
+            with conn, conn.makefile('rwb') as stream:
+                for line in stream:
+                    stream.write(self._handle_line(line))
+                    stream.flush()
+
+    def _handle_line(self, line):
+        try:
+            request = json.loads(line)
+            reply = {'response': self.system.process_request(request['query'], request.get('session_id'))}
+        except Exception as e:
+            reply = {'error': str(e)}
+            if hasattr(e, 'status_code'):
+                reply['status_code'] = e.status_code
+        return (json.dumps(reply) + '\n').encode('utf-8')
+
+    def _handle_shutdown(self, signum, frame):
+        self.running = False
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown(self):
+        for pid in list(self.workers):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.workers.clear()
+
+        if self.listener:
+            self.listener.close()
+        if self.store is not None and self.store.name:
+            self.rag.documents = []
+            self.store.close()
+            self.store.unlink()
+        print("👋 Pre-fork server stopped")
+
+
+def serve(argv=None):
+    """Command line entry point: prefork_server.py [workers] [port]"""
+    argv = sys.argv[1:] if argv is None else argv
+    workers = int(argv[0]) if len(argv) > 0 else os.cpu_count() or 4
+    port = int(argv[1]) if len(argv) > 1 else 8765
+
+    PreforkLegalServer(port=port, workers=workers).serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
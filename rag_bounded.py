@@ -0,0 +1,332 @@
+# rag_bounded.py
+import os
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from rag_final import ImprovedLegalRAG
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ByteBudgetCache:
+    """Thread-safe LRU of decoded answer bodies, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= sys.getsizeof(old)
+            self._items[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= sys.getsizeof(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._items),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class DiskAnswerStore:
+    """Append-only file of answer bodies, read back by (offset, length)"""
+
+    def __init__(self, path=None, cache_bytes=8 * 1024 * 1024):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='legal_answers_', suffix='.bin')
+            os.close(fd)
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._offsets = array('Q')
+        self._lengths = array('I')
+        self._size = 0
+        self._lock = threading.Lock()
+        self.cache = ByteBudgetCache(cache_bytes)
+
+    def append(self, text):
+        """Store one body and return its id"""
+        data = text.encode('utf-8')
+        with self._lock:
+            self._file.seek(self._size)
+            self._file.write(data)
+            self._offsets.append(self._size)
+            self._lengths.append(len(data))
+            self._size += len(data)
+            return len(self._offsets) - 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def get(self, doc_id):
+        body = self.cache.get(doc_id)
+        if body is None:
+            with self._lock:
+                self._file.seek(self._offsets[doc_id])
+                data = self._file.read(self._lengths[doc_id])
+            body = data.decode('utf-8')
+            self.cache.put(doc_id, body)
+        return body
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def memory_usage(self):
+        offsets = (self._offsets.buffer_info()[1] * self._offsets.itemsize
+                   + self._lengths.buffer_info()[1] * self._lengths.itemsize)
+        return {
+            'offsets_bytes': offsets,
+            'cache_bytes': self.cache.current_bytes,
+            'disk_bytes': self._size,
+            'resident_bytes': offsets + self.cache.current_bytes
+        }
+
+    def close(self):
+        self._file.close()
+
+
+class AnswerIndex:
+    """Inverted index over whitespace tokens of lowercased answers.
+
+    A query word (no whitespace) occurs in an answer exactly when it is a
+    substring of one of the answer's whitespace tokens, so matching query
+    words against the vocabulary reproduces the ``word in answer`` test of
+    ImprovedLegalRAG without keeping any answer text in memory.
+
+    New postings collect in a per-token dict; ``compact()`` (run once
+    ``compact_pairs`` of them are pending, and after a bulk load) packs
+    everything into four flat buffers: the vocabulary as one newline-joined
+    UTF-8 blob, token offsets into it, and every token's doc ids back to
+    back (2 bytes each while ids fit).  That drops the per-token object
+    overhead, which dominates on corpora with many rare tokens.
+    """
+
+    def __init__(self, compact_pairs=1 << 20):
+        self.compact_pairs = compact_pairs
+        self._vocabulary = b''
+        self._starts = array('I')       # token i starts at _vocabulary[_starts[i]]
+        self._bounds = array('I', [0])  # token i's ids are _postings[_bounds[i]:_bounds[i + 1]]
+        self._postings = array('H')
+        self._pending = {}              # token -> array of ids added since the last compaction
+        self._pending_pairs = 0
+        self._lock = threading.Lock()
+        self._word_cache = OrderedDict()
+
+    def add(self, doc_id, text):
+        with self._lock:
+            for token in set(text.lower().split()):
+                postings = self._pending.get(token)
+                if postings is None:
+                    postings = self._pending[token] = array('I')
+                postings.append(doc_id)
+                self._pending_pairs += 1
+            self._word_cache.clear()
+        if self._pending_pairs >= self.compact_pairs:
+            self.compact()
+
+    def compact(self):
+        """Merge pending postings into the flat buffers"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+            vocabulary = self._vocabulary.split(b'\n') if self._starts else []
+            tokens = [token.decode('utf-8') for token in vocabulary]
+            largest = max(max(ids) for ids in pending.values())
+            typecode = 'H' if self._postings.typecode == 'H' and largest < 1 << 16 else 'I'
+            postings = array(typecode)
+            bounds = array('I', [0])
+
+            for index, token in enumerate(tokens):
+                old = self._postings[self._bounds[index]:self._bounds[index + 1]]
+                postings.extend(old if old.typecode == typecode else old.tolist())
+                added = pending.pop(token, None)
+                if added is not None:
+                    postings.extend(added.tolist())
+                bounds.append(len(postings))
+            for token, added in pending.items():
+                tokens.append(token)
+                postings.extend(added.tolist())
+                bounds.append(len(postings))
+
+            encoded = [token.encode('utf-8') for token in tokens]
+            starts = array('I')
+            position = 0
+            for token in encoded:
+                starts.append(position)
+                position += len(token) + 1
+            self._vocabulary = b'\n'.join(encoded)
+            self._starts, self._bounds, self._postings = starts, bounds, postings
+            self._pending = {}
+            self._pending_pairs = 0
+
+    def docs_containing(self, word):
+        """Ids of answers that contain ``word`` as a substring"""
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            self._word_cache.move_to_end(word)
+            return cached
+
+        with self._lock:
+            doc_ids = set()
+            vocabulary, starts, bounds, postings = self._vocabulary, self._starts, self._bounds, self._postings
+            needle = word.encode('utf-8')
+            position = vocabulary.find(needle) if starts else -1
+            while position != -1:
+                # The word has no newline, so a match lies inside one token
+                index = bisect_right(starts, position) - 1
+                doc_ids.update(postings[bounds[index]:bounds[index + 1]])
+                if index + 1 == len(starts):
+                    break
+                position = vocabulary.find(needle, starts[index + 1])
+            for token, pending in self._pending.items():
+                if word in token:
+                    doc_ids.update(pending)
+        doc_ids = frozenset(doc_ids)
+
+        self._word_cache[word] = doc_ids
+        if len(self._word_cache) > 1024:
+            self._word_cache.popitem(last=False)
+        return doc_ids
+
+    def content_hits(self, query_words, min_length=5, doc_ids=None):
+        """Per-document count of distinct query words found in the answer (only ``doc_ids`` if given)"""
+        hits = {}
+        for word in query_words:
+            if len(word) >= min_length:
+                matches = self.docs_containing(word)
+                for doc_id in (matches if doc_ids is None else matches & doc_ids):
+                    hits[doc_id] = hits.get(doc_id, 0) + 1
+        return hits
+
+    def memory_usage(self):
+        size = (sys.getsizeof(self._vocabulary) + sys.getsizeof(self._starts)
+                + sys.getsizeof(self._bounds) + sys.getsizeof(self._postings) + sys.getsizeof(self._pending))
+        for token, postings in self._pending.items():
+            size += sys.getsizeof(token) + sys.getsizeof(postings)
+        return size
+
+
+class BoundedLegalRAG(ImprovedLegalRAG):
+    """Memory-bounded ImprovedLegalRAG.
+
+    Only names, types and the content index stay in RAM; answer bodies go
+    to ``answer_store`` and are read back for the handful of documents a
+    query returns, through an LRU capped at ``cache_bytes``.
+    """
+
+    def __init__(self, bucket_name='draftzi', answer_store=None, cache_bytes=8 * 1024 * 1024,
+                 store_path=None, **kwargs):
+        super().__init__(bucket_name, **kwargs)
+        if answer_store is None:
+            answer_store = DiskAnswerStore(store_path, cache_bytes=cache_bytes)
+        self.answers = answer_store
+        self.index = AnswerIndex()
+
+    def _parse_documents_improved(self, raw_data, batch_size=256):
+        """Parse in small batches, spilling each answer to the store as we go"""
+        documents = []
+        for start in range(0, len(raw_data), batch_size):
+            for doc in super()._parse_documents_improved(raw_data[start:start + batch_size]):
+                answer = doc.pop('answer')
+                self.index.add(self.answers.append(answer), answer)
+                documents.append(doc)
+        self.answers.flush()
+        self.answers.cache.clear()
+        self.index.compact()
+        return documents
+
+    def body(self, doc_id):
+        """Full answer text of one document"""
+        return self.answers.get(doc_id)
+
+    def query_documents(self, query):
+        return self._with_previews(super().query_documents(query))
+
+    def rerank_documents(self, query, doc_ids):
+        return self._with_previews(super().rerank_documents(query, doc_ids))
+
+    def _with_previews(self, result):
+        # Only the returned documents ever need their text
+        for doc in result['relevant_docs']:
+            answer = self.body(doc['doc_id'])
+            doc['preview'] = answer[:200] + "..." if len(answer) > 200 else answer
+        return result
+
+    def _rank_pairs(self, query_lower, pairs):
+        pairs = list(pairs)
+        content_hits = self.index.content_hits(set(query_lower.split()), doc_ids={doc_id for doc_id, _ in pairs})
+        relevant_docs = []
+
+        for doc_id, doc in pairs:
+            # Name matching as usual; content matching comes from the index
+            score = self._calculate_improved_relevance(query_lower, doc)
+            score = min(score + 0.1 * content_hits.get(doc_id, 0), 1.0)
+
+            if score > 0.2:
+                relevant_docs.append({
+                    'doc_id': doc_id,
+                    'name': doc['name'],
+                    'type': doc['type'],
+                    'score': score
+                })
+
+        relevant_docs.sort(key=lambda x: x['score'], reverse=True)
+        return [doc for doc in relevant_docs if self._is_truly_relevant(query_lower, doc)]
+
+    def memory_usage(self):
+        """Bytes held in RAM by each part of the pipeline, plus the process peak RSS"""
+        metadata = sys.getsizeof(self.documents) + sum(
+            sys.getsizeof(doc) + sum(sys.getsizeof(value) for value in doc.values())
+            for doc in self.documents
+        )
+        store = self.answers.memory_usage()
+        index = self.index.memory_usage()
+        usage = {
+            'metadata_bytes': metadata,
+            'index_bytes': index,
+            'answer_store': store,
+            'resident_total_bytes': metadata + index + store['resident_bytes']
+        }
+        if resource is not None:
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            usage['process_peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+        return usage
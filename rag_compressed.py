@@ -0,0 +1,125 @@
+# rag_compressed.py
+import random
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+from rag_bounded import BoundedLegalRAG, ByteBudgetCache
+
+MAX_DICTIONARY_BYTES = 32 * 1024  # deflate can only look back 32 KiB
+
+
+def train_dictionary(samples, size=MAX_DICTIONARY_BYTES):
+    """Build a preset deflate dictionary from the lines templates share most.
+
+    Lines are ranked by how many bytes they would save (count x length);
+    the best ones go last because deflate encodes nearer matches cheaper.
+    """
+    counts = Counter()
+    for text in samples:
+        for line in text.splitlines():
+            line = line.strip()
+            if len(line) > 3:
+                counts[line] += 1
+
+    chosen = []
+    total = 0
+    for line, count in sorted(counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if count < 2:
+            break
+        data = (line + '\n').encode('utf-8')
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+
+    return b''.join(reversed(chosen))
+
+
+class CompressedAnswerStore:
+    """In-memory answer bodies, each deflated against one shared dictionary.
+
+    Drop-in replacement for DiskAnswerStore: bodies live in a single
+    bytearray and are inflated on demand into a byte-budgeted LRU.
+    """
+
+    def __init__(self, dictionary=b'', level=9, cache_bytes=8 * 1024 * 1024):
+        self.dictionary = dictionary
+        self.level = level
+        self.raw_bytes = 0
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+        self._lock = threading.Lock()
+        self.cache = ByteBudgetCache(cache_bytes)
+
+    def train(self, samples, size=MAX_DICTIONARY_BYTES):
+        if len(self._offsets) > 1:
+            raise ValueError("Dictionary must be trained before any answer is stored")
+        self.dictionary = train_dictionary(samples, size)
+        print(f"📖 Trained {len(self.dictionary):,} byte compression dictionary")
+
+    def append(self, text):
+        raw = text.encode('utf-8')
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self.dictionary)
+        data = compressor.compress(raw) + compressor.flush()
+        with self._lock:
+            self._data.extend(data)
+            self._offsets.append(len(self._data))
+            self.raw_bytes += len(raw)
+            return len(self._offsets) - 2
+
+    def flush(self):
+        pass
+
+    def get(self, doc_id):
+        body = self.cache.get(doc_id)
+        if body is None:
+            with self._lock:
+                data = bytes(self._data[self._offsets[doc_id]:self._offsets[doc_id + 1]])
+            decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+            body = (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+            self.cache.put(doc_id, body)
+        return body
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def memory_usage(self):
+        offsets = self._offsets.buffer_info()[1] * self._offsets.itemsize
+        compressed = len(self._data)
+        return {
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': compressed,
+            'dictionary_bytes': len(self.dictionary),
+            'compression_ratio': self.raw_bytes / compressed if compressed else 0.0,
+            'offsets_bytes': offsets,
+            'cache_bytes': self.cache.current_bytes,
+            'resident_bytes': compressed + len(self.dictionary) + offsets + self.cache.current_bytes
+        }
+
+
+class CompressedLegalRAG(BoundedLegalRAG):
+    """BoundedLegalRAG whose answers stay in RAM, dictionary-compressed.
+
+    Inflating a body takes tens of microseconds, so the decoded-answer LRU
+    only needs the hot set (1 MiB by default rather than the disk store's 8).
+    """
+
+    def __init__(self, bucket_name='draftzi', cache_bytes=1024 * 1024, sample_size=2000, **kwargs):
+        super().__init__(bucket_name, answer_store=CompressedAnswerStore(cache_bytes=cache_bytes), **kwargs)
+        self.sample_size = sample_size
+
+    def _parse_documents_improved(self, raw_data, batch_size=256):
+        # Train on a random sample of the corpus before the first answer is compressed
+        sample = random.Random(0).sample(list(raw_data), min(self.sample_size, len(raw_data)))
+        self.answers.train([doc_str.split("Answer:", 1)[-1] for doc_str in sample])
+        return super()._parse_documents_improved(raw_data, batch_size)
+
+    def memory_usage(self):
+        """BoundedLegalRAG.memory_usage plus the overall ratio: raw answer bytes / everything resident"""
+        usage = super().memory_usage()
+        resident = usage['resident_total_bytes']
+        usage['raw_answer_bytes'] = self.answers.raw_bytes
+        usage['resident_ratio'] = self.answers.raw_bytes / resident if resident else 0.0
+        return usage
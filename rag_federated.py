@@ -0,0 +1,213 @@
+# rag_federated.py
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_final import ImprovedLegalRAG
+
+
+def _collection_worker(conn, documents, config, load_kwargs):
+    """Worker process: own one collection (given, or loaded from its bucket) and answer queries"""
+    try:
+        if documents is not None:
+            rag = ImprovedLegalRAG.from_documents(documents, config)
+        else:
+            rag = ImprovedLegalRAG(**load_kwargs)  # storage clients do not survive fork, so each worker makes its own
+            if not rag.load_final():
+                conn.send(('error', 'load failed'))
+                return
+        conn.send(('ready', len(rag.documents)))
+
+        while True:
+            query = conn.recv()
+            if query is None:
+                break
+            try:
+                conn.send(('ok', rag.query_documents(query)))
+            except Exception as e:
+                conn.send(('error', str(e)))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+class CollectionWorker:
+    """Parent-side handle on one collection served by a ``_collection_worker`` process"""
+
+    def __init__(self, documents=None, config=None, **load_kwargs):
+        parent_conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=_collection_worker,
+                                  args=(child_conn, documents, config, load_kwargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.document_count = 0
+        self._lock = threading.Lock()
+
+    def wait_ready(self):
+        """Block until the worker has its documents; True on success"""
+        status, value = self.conn.recv()
+        if status != 'ready':
+            print(f"❌ {value}")
+            self.close()
+            return False
+        self.document_count = value
+        return True
+
+    def query_documents(self, query):
+        # Only this call waits on the pipe; the scoring itself runs in the worker
+        with self._lock:
+            self.conn.send(query)
+            status, value = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.conn.close()
+        self.process.join(timeout=5)
+
+
+class FederatedLegalRAG:
+    """Several independently indexed corpora (one per bucket) behind one query.
+
+    Every collection is loaded and scored in its own worker process (the
+    ``rag_sharded`` pattern): scoring is CPU-bound, so threads in one
+    interpreter would take turns on the GIL instead of running in parallel.
+    The parent only fans queries out over pipes and merges the replies.  A
+    collection is registered once its worker has finished loading, so
+    adding one never blocks queries against the collections already served.
+    """
+
+    def __init__(self, max_workers=None):
+        self.collections = {}
+        self._registry_lock = threading.Lock()
+        # These threads only wait on worker pipes, which releases the GIL
+        self._query_pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 4,
+                                              thread_name_prefix='federated-query')
+        self._load_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='federated-load')
+
+    # ---------- collection management ----------
+
+    def add_collection(self, name, rag):
+        """Serve an already loaded pipeline's documents from a worker process under ``name``"""
+        worker = CollectionWorker(documents=rag.documents, config=rag.config)
+        if worker.wait_ready():
+            self._register(name, worker)
+        return worker
+
+    def _register(self, name, worker):
+        with self._registry_lock:
+            # Copy-on-write: in-flight queries keep iterating their own snapshot
+            collections = dict(self.collections)
+            previous = collections.get(name)
+            collections[name] = worker
+            self.collections = collections
+        if previous is not None:
+            previous.close()
+        print(f"🗂️  Collection '{name}' ready with {worker.document_count} documents")
+
+    def load_collection(self, name, bucket_name, mapping_blob='legal_mapping.pk1',
+                        config_blob='adapter_config.json'):
+        """Load one bucket in its own worker process; returns a future resolving to True/False"""
+        return self._load_pool.submit(self._load, name, bucket_name, mapping_blob, config_blob)
+
+    def load_collections(self, specs):
+        """Load many collections concurrently.
+
+        ``specs`` maps collection name to a bucket name or to a dict of
+        ``ImprovedLegalRAG`` keyword arguments.
+        """
+        futures = {}
+        for name, spec in specs.items():
+            kwargs = spec if isinstance(spec, dict) else {'bucket_name': spec}
+            futures[name] = self.load_collection(name, **kwargs)
+        return {name: future.result() for name, future in futures.items()}
+
+    def _load(self, name, bucket_name, mapping_blob, config_blob):
+        print(f"🔄 Loading collection '{name}' from bucket '{bucket_name}'...")
+        try:
+            worker = CollectionWorker(bucket_name=bucket_name, mapping_blob=mapping_blob,
+                                      config_blob=config_blob, local_prefix=f'temp_{name}')
+            if not worker.wait_ready():
+                return False
+        except Exception as e:
+            print(f"❌ Error loading collection '{name}': {e}")
+            return False
+
+        self._register(name, worker)
+        return True
+
+    def remove_collection(self, name):
+        """Unregister ``name`` and stop its worker"""
+        with self._registry_lock:
+            collections = dict(self.collections)
+            worker = collections.pop(name, None)
+            self.collections = collections
+        if worker is not None:
+            worker.close()
+        return worker is not None
+
+    # ---------- querying ----------
+
+    def query_documents(self, query, collections=None, top_k=5):
+        """Fan the query out to every collection in parallel and merge by normalised score"""
+        print(f"\n🌐 Federated query: '{query}'")
+
+        snapshot = self.collections
+        names = [name for name in (collections or snapshot) if name in snapshot]
+        futures = {name: self._query_pool.submit(snapshot[name].query_documents, query) for name in names}
+
+        merged = []
+        per_collection = {}
+        for name, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Collection '{name}' failed: {e}")
+                per_collection[name] = {'relevant_count': 0, 'answer': f"Error: {e}"}
+                continue
+
+            per_collection[name] = {'relevant_count': result['relevant_count'], 'answer': result['answer']}
+            merged.extend(self._normalise(name, result['relevant_docs']))
+
+        merged.sort(key=lambda doc: doc['normalized_score'], reverse=True)
+
+        return {
+            'query': query,
+            'relevant_count': sum(info['relevant_count'] for info in per_collection.values()),
+            'total_documents': sum(snapshot[name].document_count for name in names),
+            'relevant_docs': merged[:top_k],
+            'collections': per_collection,
+            'answer': self._federated_answer(per_collection)
+        }
+
+    def _normalise(self, name, docs):
+        """Scale scores so each collection's best match is 1.0"""
+        best = max((doc['score'] for doc in docs), default=0.0)
+        return [
+            dict(doc, collection=name, normalized_score=doc['score'] / best if best else 0.0)
+            for doc in docs
+        ]
+
+    def _federated_answer(self, per_collection):
+        matched = {name: info for name, info in per_collection.items() if info['relevant_count']}
+        if not matched:
+            return "No specific legal documents matched your query in any collection."
+        return "\n".join(f"[{name}] {info['answer']}" for name, info in matched.items())
+
+    def close(self):
+        """Stop the pools and every collection worker"""
+        self._load_pool.shutdown(wait=False)
+        self._query_pool.shutdown(wait=False)
+        with self._registry_lock:
+            workers = list(self.collections.values())
+            self.collections = {}
+        for worker in workers:
+            worker.close()
@@ -1,35 +1,56 @@
 # rag_final_improved.py
-from google.cloud import storage
 import pickle
 import json
 import re
 
+def storage_client():
+    """GCS client; google.cloud.storage is only imported when a pipeline actually needs it"""
+    from google.cloud import storage
+    return storage.Client()
+
+CANDIDATE_LIMIT = 50  # (doc_id, score) pairs returned for follow-up re-ranking
+
 class ImprovedLegalRAG:
-    def __init__(self, bucket_name='draftzi'):
-        self.client = storage.Client()
-        self.bucket = self.client.bucket(bucket_name)
-        self.documents = []
-        self.config = None
-        
-    # Add this to your rag_final.py file in the ImprovedLegalRAG class
-def query_legal_documents(self, query):
-    """Compatibility method for legal_agent.py"""
-    return self.query_documents(query)
+    def __init__(self, bucket_name='draftzi', mapping_blob='legal_mapping.pk1',
+                 config_blob='adapter_config.json', local_prefix='temp', client=None,
+                 documents=None, config=None):
+        # Pipelines built over already loaded documents never need a GCS client
+        if client is None and documents is None:
+            client = storage_client()
+        self.client = client
+        self.bucket = client.bucket(bucket_name) if client is not None else None
+        self.bucket_name = bucket_name
+        self.mapping_blob = mapping_blob
+        self.config_blob = config_blob
+        self.local_prefix = local_prefix  # keeps concurrent loads from sharing temp files
+        self.documents = documents if documents is not None else []
+        self.config = config
+    
+    @classmethod
+    def from_documents(cls, documents, config=None, **kwargs):
+        """Pipeline over documents that are already loaded (no GCS client is created)"""
+        return cls(documents=documents, config=config, **kwargs)
+        
+    def query_legal_documents(self, query):
+        """Compatibility method for legal_agent.py"""
+        return self.query_documents(query)
 
     def load_final(self):
         """Load the improved RAG pipeline"""
         print("🚀 Loading IMPROVED RAG Pipeline...")
         
         try:
-            self._download_file('legal_mapping.pk1', 'temp_mapping.pkl')
-            self._download_file('adapter_config.json', 'temp_config.json')
+            mapping_path = f'{self.local_prefix}_mapping.pkl'
+            config_path = f'{self.local_prefix}_config.json'
+            self._download_file(self.mapping_blob, mapping_path)
+            self._download_file(self.config_blob, config_path)
             
-            with open('temp_mapping.pkl', 'rb') as f:
+            with open(mapping_path, 'rb') as f:
                 raw_data = pickle.load(f)
             
             self.documents = self._parse_documents_improved(raw_data)
             
-            with open('temp_config.json', 'r') as f:
+            with open(config_path, 'r') as f:
                 self.config = json.load(f)
             
             print(f"📚 Loaded {len(self.documents)} legal documents")
@@ -102,13 +123,49 @@ def query_legal_documents(self, query):
         print(f"\n🔍 Query: '{query}'")
         
         query_lower = query.lower()
+        filtered_docs = self._rank_documents(query_lower, self.documents[:200])  # Search more documents
+        
+        return {
+            'query': query,
+            'relevant_count': len(filtered_docs),
+            'total_documents': len(self.documents),
+            'relevant_docs': filtered_docs[:5],
+            'candidates': [(doc['doc_id'], doc['score']) for doc in filtered_docs[:CANDIDATE_LIMIT]],
+            'answer': self._generate_improved_answer(query, filtered_docs)
+        }
+    
+    def rerank_documents(self, query, doc_ids):
+        """query_documents restricted to ``doc_ids`` (e.g. the previous turn's candidates)"""
+        print(f"\n🔁 Re-ranking {len(doc_ids)} candidates: '{query}'")
+        
+        query_lower = query.lower()
+        filtered_docs = self._rank_pairs(
+            query_lower, ((doc_id, self.documents[doc_id]) for doc_id in sorted(set(doc_ids)))
+        )
+        
+        return {
+            'query': query,
+            'relevant_count': len(filtered_docs),
+            'total_documents': len(self.documents),
+            'relevant_docs': filtered_docs[:5],
+            'candidates': [(doc['doc_id'], doc['score']) for doc in filtered_docs[:CANDIDATE_LIMIT]],
+            'answer': self._generate_improved_answer(query, filtered_docs)
+        }
+    
+    def _rank_documents(self, query_lower, documents, start=0):
+        """Score, sort and filter a run of documents (``start`` is the id of the first one)"""
+        return self._rank_pairs(query_lower, enumerate(documents, start))
+    
+    def _rank_pairs(self, query_lower, pairs):
+        """Score, sort and filter (doc_id, doc) pairs in one pass"""
         relevant_docs = []
         
-        for doc in self.documents[:200]:  # Search more documents
+        for doc_id, doc in pairs:
             score = self._calculate_improved_relevance(query_lower, doc)
             
             if score > 0.2:  # Higher threshold for better quality
                 relevant_docs.append({
+                    'doc_id': doc_id,
                     'name': doc['name'],
                     'type': doc['type'],
                     'score': score,
@@ -119,52 +176,43 @@ def query_legal_documents(self, query):
         relevant_docs.sort(key=lambda x: x['score'], reverse=True)
         
         # Filter to only show truly relevant documents
-        filtered_docs = [doc for doc in relevant_docs if self._is_truly_relevant(query_lower, doc)]
-        
-        return {
-            'query': query,
-            'relevant_count': len(filtered_docs),
-            'total_documents': len(self.documents),
-            'relevant_docs': filtered_docs[:5],
-            'answer': self._generate_improved_answer(query, filtered_docs)
-        }
+        return [doc for doc in relevant_docs if self._is_truly_relevant(query_lower, doc)]
     
     def _calculate_improved_relevance(self, query, doc):
-    """More accurate relevance scoring"""
-    score = 0.0  # Remove the "???? IG" part
-    
-    # Handle both dictionary and string document types
-    if isinstance(doc, dict):
-        doc_name_lower = doc.get('name', '').lower()
-        doc_content_lower = doc.get('answer', '').lower()
-    else:
-        doc_name_lower = str(doc).lower()
-        doc_content_lower = str(doc).lower()
-    
-    query_lower = query.lower()
-    query_words = set(query_lower.split())
-    
-    # Check for exact document type matches
-    if 'nda' in query_lower and any(keyword in doc_name_lower for keyword in ['nda', 'non-disclosure']):
-        score += 1.0
-    if 'employment' in query_lower and any(keyword in doc_name_lower for keyword in ['employment', 'employee']):
-        score += 1.0
-    if 'llc' in query_lower and 'llc' in doc_name_lower:
-        score += 1.0
-    if 'partnership' in query_lower and 'partnership' in doc_name_lower:
-        score += 1.0
-    if 'contract' in query_lower and 'contract' in doc_name_lower:
-        score += 0.8
-    if 'agreement' in query_lower and 'agreement' in doc_name_lower:
-        score += 0.8
-        
-    # Content matching (lower weight)
-    for word in query_words:
-        if len(word) > 4 and word in doc_content_lower:
-            score += 0.1
-    
-    return min(score, 1.0)
-    return min(score, 1.0)
+        """More accurate relevance scoring"""
+        score = 0.0  # Remove the "???? IG" part
+        
+        # Handle both dictionary and string document types
+        if isinstance(doc, dict):
+            doc_name_lower = doc.get('name', '').lower()
+            doc_content_lower = doc.get('answer', '').lower()
+        else:
+            doc_name_lower = str(doc).lower()
+            doc_content_lower = str(doc).lower()
+        
+        query_lower = query.lower()
+        query_words = set(query_lower.split())
+        
+        # Check for exact document type matches
+        if 'nda' in query_lower and any(keyword in doc_name_lower for keyword in ['nda', 'non-disclosure']):
+            score += 1.0
+        if 'employment' in query_lower and any(keyword in doc_name_lower for keyword in ['employment', 'employee']):
+            score += 1.0
+        if 'llc' in query_lower and 'llc' in doc_name_lower:
+            score += 1.0
+        if 'partnership' in query_lower and 'partnership' in doc_name_lower:
+            score += 1.0
+        if 'contract' in query_lower and 'contract' in doc_name_lower:
+            score += 0.8
+        if 'agreement' in query_lower and 'agreement' in doc_name_lower:
+            score += 0.8
+            
+        # Content matching (lower weight)
+        for word in query_words:
+            if len(word) > 4 and word in doc_content_lower:
+                score += 0.1
+        
+        return min(score, 1.0)
     
     def _is_truly_relevant(self, query, doc):
         """Check if document is truly relevant to query"""
@@ -183,27 +231,32 @@ def query_legal_documents(self, query):
     
     def _generate_improved_answer(self, query, relevant_docs):
         """Generate better answers based on actual document content"""
-        if not relevant_docs:
-            return "No specific legal documents matched your query exactly. Try using more specific terms or browse general legal templates."
-        
         # Count documents by type
         type_counts = {}
         for doc in relevant_docs:
             type_counts[doc['type']] = type_counts.get(doc['type'], 0) + 1
         
+        return self._answer_from_type_counts(query, type_counts)
+    
+    def _answer_from_type_counts(self, query, type_counts):
+        """Answer text from per-type match counts (lets sharded queries skip the full list)"""
+        if not type_counts:
+            return "No specific legal documents matched your query exactly. Try using more specific terms or browse general legal templates."
+        
+        relevant_count = sum(type_counts.values())
         top_type = max(type_counts.items(), key=lambda x: x[1])[0] if type_counts else 'general'
         
         if 'nda' in query.lower():
-            return f"Found {len(relevant_docs)} Non-Disclosure Agreement templates. These include mutual and one-way NDAs with comprehensive confidentiality clauses."
+            return f"Found {relevant_count} Non-Disclosure Agreement templates. These include mutual and one-way NDAs with comprehensive confidentiality clauses."
         
         elif 'employment' in query.lower():
-            return f"Found {len(relevant_docs)} employment-related documents including contracts, policies, and workplace guidelines."
+            return f"Found {relevant_count} employment-related documents including contracts, policies, and workplace guidelines."
         
         elif any(keyword in query.lower() for keyword in ['llc', 'partnership', 'business']):
-            return f"Found {len(relevant_docs)} business formation documents covering entity structure, governance, and operational agreements."
+            return f"Found {relevant_count} business formation documents covering entity structure, governance, and operational agreements."
         
         else:
-            return f"Found {len(relevant_docs)} relevant legal documents. The most common type is {top_type} documents."
+            return f"Found {relevant_count} relevant legal documents. The most common type is {top_type} documents."
 
 # Test the improved version
 def test_improved_rag():
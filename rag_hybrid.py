@@ -0,0 +1,112 @@
+# rag_hybrid.py
+from concurrent.futures import ThreadPoolExecutor
+
+from embeddings import HashingEmbedder, QueryEncoder, build_embeddings, document_texts
+from rag_bounded import AnswerIndex
+from rag_final import CANDIDATE_LIMIT, ImprovedLegalRAG
+from vector_quant import QuantizedVectorIndex
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank)"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=lambda doc_id: fused[doc_id], reverse=True), fused
+
+
+class HybridLegalRAG(ImprovedLegalRAG):
+    """Lexical + dense retrieval fused with RRF in front of the keyword scorer.
+
+    Both candidate legs run concurrently and are cheap (an inverted index
+    lookup and one quantized matrix scan); ``_calculate_improved_relevance``
+    then only runs on the fused shortlist.  Dense similarity is blended into
+    the final score so paraphrases ("hire letter") still reach the
+    templates the keyword rules would miss ("employment contract").
+    """
+
+    def __init__(self, rag, embedder=None, embedding_cache=None, encoding='int8',
+                 candidates=50, shortlist=30, rrf_k=60, semantic_weight=0.5):
+        super().__init__(rag.bucket_name, rag.mapping_blob, rag.config_blob, rag.local_prefix,
+                         client=rag.client, documents=rag.documents, config=rag.config)
+        self.rag = rag
+        self.candidates = candidates
+        self.shortlist = shortlist
+        self.rrf_k = rrf_k
+        self.semantic_weight = semantic_weight
+        self.embedder = embedder or HashingEmbedder()
+        self.query_encoder = QueryEncoder(self.embedder)
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hybrid')
+
+        texts = document_texts(rag)
+        self.lexical_index = AnswerIndex()
+        for doc_id, text in enumerate(texts):
+            self.lexical_index.add(doc_id, text)
+        self.lexical_index.compact()
+        vectors = build_embeddings(texts, self.embedder, embedding_cache)
+        self.vector_index = QuantizedVectorIndex(vectors, encoding)
+        print(f"🔀 Hybrid retriever ready over {len(texts)} documents")
+
+    def query_documents(self, query):
+        """Same contract as ImprovedLegalRAG.query_documents, with hybrid candidate generation"""
+        print(f"\n🔍 Hybrid query: '{query}'")
+
+        query_lower = query.lower()
+        lexical = self._pool.submit(self._lexical_candidates, query_lower)
+        dense = self._pool.submit(self._dense_candidates, query)
+        lexical_ids = lexical.result()
+        dense_ids, similarities = dense.result()
+
+        fused_ids, fused_scores = reciprocal_rank_fusion([lexical_ids, dense_ids], self.rrf_k)
+        filtered_docs = self._score_shortlist(query_lower, fused_ids[:self.shortlist],
+                                              dict(zip(dense_ids, similarities)), fused_scores)
+
+        return {
+            'query': query,
+            'relevant_count': len(filtered_docs),
+            'total_documents': len(self.documents),
+            'relevant_docs': filtered_docs[:5],
+            'candidates': [(doc['doc_id'], doc['score']) for doc in filtered_docs[:CANDIDATE_LIMIT]],
+            'answer': self._generate_improved_answer(query, filtered_docs)
+        }
+
+    def rerank_documents(self, query, doc_ids):
+        # A known candidate set needs no candidate generation; the wrapped pipeline scores it
+        return self.rag.rerank_documents(query, doc_ids)
+
+    def _lexical_candidates(self, query_lower):
+        hits = self.lexical_index.content_hits(set(query_lower.split()), min_length=3)
+        ranked = sorted(hits, key=lambda doc_id: (-hits[doc_id], doc_id))
+        return ranked[:self.candidates]
+
+    def _dense_candidates(self, query):
+        query_vector = self.query_encoder.encode_query(query)
+        ids, scores = self.vector_index.search(query_vector, self.candidates)
+        return [int(doc_id) for doc_id in ids], [float(score) for score in scores]
+
+    def _score_shortlist(self, query_lower, doc_ids, similarities, fused_scores):
+        relevant_docs = []
+        for doc_id in doc_ids:
+            doc = self.documents[doc_id]
+            answer = doc['answer'] if 'answer' in doc else self.rag.body(doc_id)
+            keyword_score = self._calculate_improved_relevance(query_lower, dict(doc, answer=answer))
+            semantic_score = max(similarities.get(doc_id, 0.0), 0.0)
+            score = min(keyword_score + self.semantic_weight * semantic_score, 1.0)
+
+            if score > 0.2:
+                relevant_docs.append({
+                    'doc_id': doc_id,
+                    'name': doc['name'],
+                    'type': doc['type'],
+                    'score': score,
+                    'fused_score': fused_scores[doc_id],
+                    'preview': answer[:200] + "..." if len(answer) > 200 else answer
+                })
+
+        relevant_docs.sort(key=lambda x: (x['score'], x['fused_score']), reverse=True)
+        return [doc for doc in relevant_docs if self._is_truly_relevant(query_lower, doc)]
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.query_encoder.close()
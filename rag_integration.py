@@ -1,11 +1,12 @@
 # rag_integration_fixed.py
-from google.cloud import storage
 import pickle
 import json
 
+from rag_final import storage_client
+
 class LegalRAGSystemFixed:
     def __init__(self, bucket_name='draftzi'):
-        self.client = storage.Client()
+        self.client = storage_client()
         self.bucket = self.client.bucket(bucket_name)
         self.vector_index = None
         self.document_mapping = None
@@ -39,6 +40,23 @@ class LegalRAGSystemFixed:
             print(f"❌ Error loading RAG pipeline: {e}")
             return False
     
+    def build_vector_index(self, encoding='int8', full_vectors_path=None, **pq_options):
+        """Load legal_faiss.index into a quantized (int8 or PQ) vector index"""
+        from vector_quant import QuantizedVectorIndex, load_faiss_vectors
+        
+        try:
+            vectors = load_faiss_vectors('temp_legal_faiss.index')
+            self.vector_index = QuantizedVectorIndex(vectors, encoding, full_vectors=full_vectors_path, **pq_options)
+            
+            usage = self.vector_index.memory_usage()
+            print(f"🧮 Quantized {len(self.vector_index)} vectors ({encoding}): "
+                  f"{usage['codes_bytes']:,} bytes vs {usage['float32_equivalent_bytes']:,} as float32")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error building vector index: {e}")
+            return False
+    
     def _download_file(self, blob_name, local_path):
         """Download a file from GCS"""
         blob = self.bucket.blob(blob_name)
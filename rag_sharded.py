@@ -0,0 +1,126 @@
+# rag_sharded.py
+import heapq
+import multiprocessing as mp
+import os
+import threading
+
+from rag_final import CANDIDATE_LIMIT, ImprovedLegalRAG
+from rag_shared import SharedDocumentStore
+
+
+def _shard_worker(conn, documents, store_name, start, stop):
+    """Worker process: own one shard and answer (query, top_k) requests until told to stop"""
+    store = None
+    if store_name:
+        store = SharedDocumentStore.attach(name=store_name)
+        documents = store[start:stop]
+    scorer = ImprovedLegalRAG.from_documents(documents)
+
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            query_lower, top_k = request
+            ranked = scorer._rank_documents(query_lower, scorer.documents, start)
+
+            type_counts = {}
+            for doc in ranked:
+                type_counts[doc['type']] = type_counts.get(doc['type'], 0) + 1
+            candidates = [(doc['doc_id'], doc['score']) for doc in ranked[:CANDIDATE_LIMIT]]
+            conn.send((type_counts, ranked[:top_k], candidates))
+    finally:
+        conn.close()
+        if store is not None:
+            scorer.documents = []
+            store.close()
+
+
+class ShardedLegalRAG(ImprovedLegalRAG):
+    """Scatter-gather front end over N shard worker processes.
+
+    Each worker scores its slice of the corpus and returns only its top-k
+    matches plus per-type counts; the gather step merges the per-shard
+    lists by score.  Unlike the single-process loop, which stops after the
+    first 200 documents, every shard scans its whole slice.
+    """
+
+    def __init__(self, rag, num_shards=None, top_k=5):
+        super().__init__(rag.bucket_name, rag.mapping_blob, rag.config_blob, rag.local_prefix,
+                         client=rag.client, documents=rag.documents, config=rag.config)
+        self.top_k = top_k
+        self.num_shards = max(1, min(num_shards or os.cpu_count() or 1, len(self.documents) or 1))
+        self.shards = []
+        self._lock = threading.Lock()
+        self._start_shards()
+
+    def _start_shards(self):
+        total = len(self.documents)
+        size = -(-total // self.num_shards)  # ceiling division
+        store_name = getattr(self.documents, 'name', None)
+
+        for start in range(0, max(total, 1), max(size, 1)):
+            stop = min(start + size, total)
+            # Shared stores are attached by name; plain lists are handed over directly
+            documents = None if store_name else self.documents[start:stop]
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(
+                target=_shard_worker,
+                args=(child_conn, documents, store_name, start, stop),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self.shards.append((process, parent_conn))
+
+        print(f"🧩 Started {len(self.shards)} shard workers over {total} documents")
+
+    def query_documents(self, query):
+        """Same contract as ImprovedLegalRAG.query_documents, scored in parallel"""
+        print(f"\n🔍 Query: '{query}'")
+
+        query_lower = query.lower()
+        type_counts, top_docs, candidates = self._scatter_gather(query_lower, self.top_k)
+
+        return {
+            'query': query,
+            'relevant_count': sum(type_counts.values()),
+            'total_documents': len(self.documents),
+            'relevant_docs': top_docs,
+            'candidates': candidates,
+            'answer': self._answer_from_type_counts(query, type_counts)
+        }
+
+    def _scatter_gather(self, query_lower, top_k):
+        with self._lock:
+            for _, conn in self.shards:
+                conn.send((query_lower, top_k))
+            replies = [conn.recv() for _, conn in self.shards]
+
+        type_counts = {}
+        for shard_counts, _, _ in replies:
+            for doc_type, count in shard_counts.items():
+                type_counts[doc_type] = type_counts.get(doc_type, 0) + count
+
+        # Shard lists are already sorted; keep corpus order between equal scores
+        merged = heapq.merge(*(docs for _, docs, _ in replies), key=lambda d: (-d['score'], d['doc_id']))
+        candidates = heapq.merge(*(pairs for _, _, pairs in replies), key=lambda pair: (-pair[1], pair[0]))
+        return type_counts, list(merged)[:top_k], list(candidates)[:CANDIDATE_LIMIT]
+
+    def close(self):
+        """Stop the shard workers"""
+        for process, conn in self.shards:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process, _ in self.shards:
+            process.join(timeout=5)
+        self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
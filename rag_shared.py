@@ -0,0 +1,192 @@
+# rag_shared.py
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+
+from rag_final import ImprovedLegalRAG
+
+MAGIC = b'LRAGSHM1'
+HEADER = struct.Struct('<8sQQ')  # magic, document count, config length
+FIELDS = ('name', 'type', 'prompt', 'answer')
+
+
+class SharedDocumentStore(Sequence):
+    """Read-only document store backed by one shared memory segment or mmap file.
+
+    Layout: header | config JSON | uint64 field boundaries | UTF-8 text blob.
+    Field ``f`` of document ``i`` lives between boundaries ``i*4+f`` and
+    ``i*4+f+1``, so workers decode only the documents a query touches.
+    """
+
+    def __init__(self, buf, shm=None, mapping=None, file=None):
+        self._shm = shm
+        self._mmap = mapping
+        self._file = file
+        self._buf = buf
+
+        magic, count, config_len = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a shared legal document store")
+
+        self.count = count
+        config_start = HEADER.size
+        bounds_start = config_start + config_len
+        bounds_end = bounds_start + (count * len(FIELDS) + 1) * 8
+        self.config = json.loads(bytes(buf[config_start:bounds_start]) or b'null')
+        self._bounds = buf[bounds_start:bounds_end].cast('Q')
+        self._blob = buf[bounds_end:]
+
+    # ---------- publishing ----------
+
+    @classmethod
+    def publish(cls, documents, config=None, name=None, path=None):
+        """Pack documents once and expose them to other processes.
+
+        With ``path`` the store is written to a file that workers mmap;
+        otherwise a ``multiprocessing.shared_memory`` segment is created
+        (named ``name`` if given) and must be ``unlink()``-ed by the owner.
+        """
+        payload = cls._pack(documents, config)
+
+        if path:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            print(f"📤 Published {len(documents)} documents to {path} ({len(payload):,} bytes)")
+            return cls.attach(path=path)
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(payload))
+        shm.buf[:len(payload)] = payload
+        print(f"📤 Published {len(documents)} documents to shared memory '{shm.name}' ({len(payload):,} bytes)")
+        return cls(shm.buf.toreadonly(), shm=shm)
+
+    @classmethod
+    def attach(cls, name=None, path=None):
+        """Attach read-only to a store published by another process"""
+        if path:
+            f = open(path, 'rb')
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(memoryview(mapping), mapping=mapping, file=f)
+
+        if not name:
+            raise ValueError("Either a shared memory name or a file path is required")
+        shm = _attach_segment(name)
+        return cls(shm.buf.toreadonly(), shm=shm)
+
+    @staticmethod
+    def _pack(documents, config):
+        config_bytes = json.dumps(config).encode('utf-8') if config is not None else b''
+        bounds = [0]
+        chunks = []
+        size = 0
+        for doc in documents:
+            for field in FIELDS:
+                data = str(doc.get(field, '')).encode('utf-8')
+                chunks.append(data)
+                size += len(data)
+                bounds.append(size)
+
+        header = HEADER.pack(MAGIC, len(documents), len(config_bytes))
+        return b''.join([header, config_bytes, struct.pack(f'<{len(bounds)}Q', *bounds)] + chunks)
+
+    # ---------- Sequence interface ----------
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._document(i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("document index out of range")
+        return self._document(index)
+
+    def _document(self, index):
+        base = index * len(FIELDS)
+        return {field: self._field(base + offset) for offset, field in enumerate(FIELDS)}
+
+    def _field(self, slot):
+        return str(self._blob[self._bounds[slot]:self._bounds[slot + 1]], 'utf-8')
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm else None
+
+    @property
+    def nbytes(self):
+        return self._buf.nbytes
+
+    # ---------- lifecycle ----------
+
+    def close(self):
+        """Release this process' view of the store"""
+        for view in (self._bounds, self._blob, self._buf):
+            view.release()
+        if self._shm:
+            self._shm.close()
+        if self._mmap:
+            self._mmap.close()
+        if self._file:
+            self._file.close()
+
+    def unlink(self):
+        """Destroy the shared segment (owner only, after workers are done)"""
+        if self._shm:
+            self._shm.unlink()
+
+
+def _attach_segment(name):
+    """Attach without letting this process' resource tracker unlink the segment on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no ``track`` flag; skip registration by hand instead
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedLegalRAG(ImprovedLegalRAG):
+    """ImprovedLegalRAG served from a store published by a loader process.
+
+    Workers never touch GCS: they attach to the segment (or mmap file) and
+    query it exactly like a locally loaded pipeline.
+    """
+
+    def __init__(self, name=None, path=None, **kwargs):
+        self.store = SharedDocumentStore.attach(name=name, path=path)
+        super().__init__(documents=self.store, config=self.store.config, **kwargs)
+        print(f"📎 Attached to {len(self.documents)} shared legal documents")
+
+    def close(self):
+        self.documents = []
+        self.store.close()
+
+
+def publish_final(rag, name=None, path=None):
+    """Publish an already loaded ImprovedLegalRAG for worker processes.
+
+    The loader's own copy is swapped for the packed store so the corpus is
+    held in memory exactly once per node.
+    """
+    store = SharedDocumentStore.publish(rag.documents, rag.config, name=name, path=path)
+    rag.documents = store
+    return store
+
+
+def load_and_publish(bucket_name='draftzi', name=None, path=None):
+    """Loader process entry point: load from GCS once, then publish"""
+    rag = ImprovedLegalRAG(bucket_name)
+    if not rag.load_final():
+        return None
+    return publish_final(rag, name=name, path=path)
@@ -1,11 +1,12 @@
 # rag_simple_fixed.py
-from google.cloud import storage
 import pickle
 import json
 
+from rag_final import storage_client
+
 class SimpleLegalRAG:
     def __init__(self, bucket_name='draftzi'):
-        self.client = storage.Client()
+        self.client = storage_client()
         self.bucket = self.client.bucket(bucket_name)
         self.document_texts = []  # Store document texts
         self.config = None
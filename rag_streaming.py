@@ -0,0 +1,123 @@
+# rag_streaming.py
+import io
+import json
+import pickle
+import threading
+
+from rag_final import ImprovedLegalRAG
+
+
+def export_records(raw_data, path):
+    """Write the raw mapping list as JSON Lines (one document record per line)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for doc_str in raw_data:
+            f.write(json.dumps(doc_str))
+            f.write('\n')
+    print(f"💾 Exported {len(raw_data)} records to {path}")
+
+
+def convert_mapping(pickle_path='temp_mapping.pkl', records_path='legal_mapping.jsonl'):
+    """One-off conversion of the pickled mapping into the streamable record format"""
+    with open(pickle_path, 'rb') as f:
+        export_records(pickle.load(f), records_path)
+
+
+class StreamingLegalRAG(ImprovedLegalRAG):
+    """ImprovedLegalRAG that answers queries while the corpus is still loading.
+
+    Records are read line by line from a JSON Lines file (local or in the
+    bucket), parsed and appended in batches on a background thread.  After
+    ``ready_batches`` batches the pipeline is "partially ready": queries run
+    against the loaded prefix and say so through the ``complete`` flag.
+    """
+
+    def __init__(self, bucket_name='draftzi', records_blob='legal_mapping.jsonl',
+                 batch_size=256, ready_batches=1, **kwargs):
+        super().__init__(bucket_name, **kwargs)
+        self.records_blob = records_blob
+        self.batch_size = batch_size
+        self.ready_batches = ready_batches
+        self.ready = threading.Event()
+        self.complete = False
+        self.load_error = None
+        self._loader = None
+
+    def load_streaming(self, path=None, background=True):
+        """Start streaming records from ``path`` (or the records blob)"""
+        print("🚀 Streaming IMPROVED RAG Pipeline...")
+
+        try:
+            config_path = f'{self.local_prefix}_config.json'
+            self._download_file(self.config_blob, config_path)
+            with open(config_path, 'r') as f:
+                self.config = json.load(f)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return False
+
+        self.documents = []
+        self.complete = False
+        self.ready.clear()
+
+        if background:
+            self._loader = threading.Thread(target=self._stream_records, args=(path,), daemon=True)
+            self._loader.start()
+        else:
+            self._stream_records(path)
+        return True
+
+    def _open_records(self, path):
+        if path:
+            return open(path, 'r', encoding='utf-8')
+        blob = self.bucket.blob(self.records_blob)
+        print(f"   📡 Streaming: {self.records_blob}")
+        return io.TextIOWrapper(blob.open('rb'), encoding='utf-8')
+
+    def _stream_records(self, path):
+        batches = 0
+        try:
+            with self._open_records(path) as records:
+                batch = []
+                for line in records:
+                    if line.strip():
+                        batch.append(json.loads(line))
+                    if len(batch) >= self.batch_size:
+                        batches += 1
+                        self._index_batch(batch, batches)
+                        batch = []
+                if batch:
+                    batches += 1
+                    self._index_batch(batch, batches)
+        except Exception as e:
+            self.load_error = e
+            print(f"❌ Error while streaming records: {e}")
+        finally:
+            self.complete = self.load_error is None
+            self.ready.set()
+
+        if self.complete:
+            print(f"📚 Finished streaming {len(self.documents)} legal documents")
+
+    def _index_batch(self, batch, batches):
+        # extend() is atomic under the GIL, so concurrent queries always see a clean prefix
+        self.documents.extend(self._parse_documents_improved(batch))
+        if batches == self.ready_batches:
+            print(f"⚡ Partially ready with {len(self.documents)} documents")
+            self.ready.set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the first batches are indexed (or loading stopped)"""
+        return self.ready.wait(timeout)
+
+    def wait_until_complete(self, timeout=None):
+        if self._loader is not None:
+            self._loader.join(timeout)
+        return self.complete
+
+    def query_documents(self, query):
+        """Query whatever prefix is loaded; ``complete`` tells callers if it was the full corpus"""
+        complete = self.complete
+        result = super().query_documents(query)
+        result['complete'] = complete
+        result['loaded_documents'] = result['total_documents']
+        return result
@@ -0,0 +1,193 @@
+# scheduler.py
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from async_rag import LoopLocal
+
+# Intents answered without touching the generator
+FAST_INTENTS = {'calculation', 'analysis'}
+
+# Heavy work is served low complexity first
+COMPLEXITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+
+class OverloadedError(Exception):
+    """Raised instead of queueing when a lane is full (maps to HTTP 429)"""
+
+    status_code = 429
+
+    def __init__(self, lane, depth):
+        super().__init__(f"{lane} lane is full ({depth} requests pending), try again shortly")
+        self.lane = lane
+        self.depth = depth
+
+
+class AgingQueue:
+    """Heavy-lane queue: lowest complexity rank first, FIFO within a rank, with aging.
+
+    Every ``age_step`` seconds of waiting count as one rank, i.e. jobs are
+    served by ``submitted + rank * age_step``: a high-complexity job runs no
+    later than the low ones submitted ``2 * age_step`` after it, so a steady
+    stream of cheap requests cannot starve it.  ``age_step=None`` orders
+    strictly by rank.
+    """
+
+    def __init__(self, ranks, age_step=2.0, clock=time.monotonic):
+        self.age_step = age_step
+        self.clock = clock
+        self._ranks = [deque() for _ in range(ranks)]
+        self._order = itertools.count()
+        self._closed = False
+        self._ready = threading.Condition()
+
+    def put(self, rank, item):
+        with self._ready:
+            self._ranks[rank].append((self._deadline(rank), next(self._order), item))
+            self._ready.notify()
+
+    def get(self):
+        """Next job, or None once closed and drained"""
+        with self._ready:
+            while not any(self._ranks):
+                if self._closed:
+                    return None
+                self._ready.wait()
+            # Each rank is FIFO, so only the heads can be next
+            _, rank = min((jobs[0][:2], rank) for rank, jobs in enumerate(self._ranks) if jobs)
+            return self._ranks[rank].popleft()[2]
+
+    def _deadline(self, rank):
+        return self.clock() + rank * self.age_step if self.age_step else rank
+
+    def close(self):
+        """Let workers exit once the queued jobs are done"""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+    def __len__(self):
+        with self._ready:
+            return sum(len(jobs) for jobs in self._ranks)
+
+
+class ComplexityScheduler:
+    """Two-lane admission control keyed on intent and complexity.
+
+    Calculations and analysis go to the fast lane, which never waits behind
+    document generation.  Everything else goes to a bounded heavy pool whose
+    queue is ordered by complexity (low before medium before high, FIFO
+    within a level), with queued work promoted one level per ``age_step``
+    seconds of waiting so high-complexity requests are never starved.  A
+    lane with more than ``max_*_queue`` requests pending rejects new ones
+    with ``OverloadedError``.
+    """
+
+    def __init__(self, fast_workers=4, heavy_workers=4, max_fast_queue=256, max_heavy_queue=32, age_step=2.0):
+        self.max_depth = {'fast': max_fast_queue, 'heavy': max_heavy_queue}
+        self.fast_workers = fast_workers
+        self.heavy_workers = heavy_workers
+        self.pending = {'fast': 0, 'heavy': 0}
+        self.completed = {'fast': 0, 'heavy': 0}
+        self.rejected = {'fast': 0, 'heavy': 0}
+        self.age_step = age_step
+        self._lock = threading.Lock()
+        self._pid = None
+        self._heavy_slots = LoopLocal(lambda: asyncio.Semaphore(self.heavy_workers))
+
+    def _ensure_workers(self):
+        # Threads do not survive fork (prefork_server builds the system first), so each process starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._fast = ThreadPoolExecutor(max_workers=self.fast_workers, thread_name_prefix='legal-fast')
+            self._heavy = AgingQueue(len(COMPLEXITY_RANK), self.age_step)
+            self._heavy_threads = [
+                threading.Thread(target=self._heavy_worker, args=(self._heavy,), daemon=True, name=f'legal-heavy-{i}')
+                for i in range(self.heavy_workers)
+            ]
+            for thread in self._heavy_threads:
+                thread.start()
+
+    @staticmethod
+    def lane_for(intent):
+        # Complexity only orders work inside the heavy lane
+        return 'fast' if intent in FAST_INTENTS else 'heavy'
+
+    def submit(self, intent, complexity, fn, *args):
+        """Schedule ``fn(*args)``; returns a Future or raises OverloadedError"""
+        lane = self.lane_for(intent)
+        self._ensure_workers()
+        self._admit(lane)
+        if lane == 'fast':
+            future = self._fast.submit(fn, *args)
+        else:
+            future = Future()
+            self._heavy.put(COMPLEXITY_RANK.get(complexity, 1), (fn, args, future))
+        future.add_done_callback(lambda done: self._release(lane))
+        return future
+
+    def run(self, intent, complexity, fn, *args):
+        return self.submit(intent, complexity, fn, *args).result()
+
+    async def run_async(self, intent, complexity, coro_fn, *args):
+        """Event-loop version: heavy coroutines hold one of ``heavy_workers`` slots, fast ones never wait"""
+        lane = self.lane_for(intent)
+        self._admit(lane)
+        try:
+            if lane == 'fast':
+                return await coro_fn(*args)
+            async with self._heavy_slots.get():
+                return await coro_fn(*args)
+        finally:
+            self._release(lane)
+
+    def _admit(self, lane):
+        with self._lock:
+            if self.pending[lane] >= self.max_depth[lane]:
+                self.rejected[lane] += 1
+                raise OverloadedError(lane, self.pending[lane])
+            self.pending[lane] += 1
+
+    def _release(self, lane):
+        with self._lock:
+            self.pending[lane] -= 1
+            self.completed[lane] += 1
+
+    def _heavy_worker(self, jobs):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            fn, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                lane: {
+                    'pending': self.pending[lane],
+                    'completed': self.completed[lane],
+                    'rejected': self.rejected[lane],
+                    'max_depth': self.max_depth[lane]
+                }
+                for lane in ('fast', 'heavy')
+            }
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        self._fast.shutdown(wait=False)
+        self._heavy.close()  # queued work still drains first
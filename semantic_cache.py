@@ -0,0 +1,203 @@
+# semantic_cache.py
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+# Words that change how a request is phrased but not what is being asked for
+STOPWORDS = {
+    'a', 'an', 'the', 'for', 'me', 'my', 'please', 'of', 'to', 'with', 'and', 'i', 'need', 'want',
+    'generate', 'create', 'draft', 'make', 'prepare', 'write', 'give', 'can', 'you', 'some', 'new'
+}
+
+# Phrase-level synonyms, applied before tokenisation (longest first)
+SYNONYMS = [
+    ('non-disclosure agreement', 'nda'),
+    ('non disclosure agreement', 'nda'),
+    ('non-disclosure', 'nda'),
+    ('confidentiality agreement', 'nda'),
+    ('two-way', 'mutual'),
+    ('two way', 'mutual'),
+    ('bilateral', 'mutual'),
+    ('one-way', 'unilateral'),
+    ('one way', 'unilateral'),
+    ('employment agreement', 'employment contract'),
+    ('operating agreement', 'llc agreement'),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9%$.]+")
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a request (same meaning, same string)"""
+    return " ".join(query.lower().split()).strip(" .!?")
+
+
+def canonical_tokens(query):
+    """Content tokens of a request in order, after synonym folding and stop-word removal.
+
+    Order is kept: "Acme discloses to Beta" and "Beta discloses to Acme" are
+    different requests.
+    """
+    text = normalize_query(query)
+    for phrase, replacement in SYNONYMS:
+        text = text.replace(phrase, replacement)
+    tokens = (token.strip('.') for token in TOKEN_PATTERN.findall(text))
+    return [token for token in tokens if token and token not in STOPWORDS]
+
+
+def shingles(tokens, size=2):
+    """Overlapping word n-grams, padded so the first and last words count as often as the rest"""
+    padded = ['^'] + list(tokens) + ['$']
+    return [" ".join(padded[i:i + size]) for i in range(len(padded) - size + 1)]
+
+
+def simhash(features, bits=64):
+    """Charikar SimHash: near-identical feature lists give fingerprints a few bits apart"""
+    weights = [0] * bits
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+class SemanticQueryCache:
+    """Bounded LRU cache that also answers near-duplicate queries.
+
+    Lookups try the canonical token sequence first, then neighbours whose
+    SimHash over word bigrams is within ``max_distance`` bits, found through
+    4 x 16-bit LSH bands.  Bigrams keep word order, so swapping the parties
+    of a request changes the fingerprint rather than matching it.  With an
+    ``embedder`` (see embeddings.py) the neighbour test is cosine similarity
+    of query embeddings instead.
+    """
+
+    BANDS = 4
+    BAND_BITS = 16
+
+    def __init__(self, max_entries=1024, max_distance=3, embedder=None, similarity=0.92):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.embedder = embedder
+        self.similarity = similarity
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # canonical key -> (fingerprint, vector, value)
+        self._bands = [{} for _ in range(self.BANDS)]
+        self._lock = threading.Lock()
+
+    def get(self, query, namespace=''):
+        """Cached value for ``query`` or a near-duplicate of it, else None"""
+        key, fingerprint, vector = self._signature(query, namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                key = self._find_neighbour(namespace, fingerprint, vector)
+                entry = self._entries.get(key) if key else None
+                if entry is not None:
+                    self.near_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, query, value, namespace=''):
+        key, fingerprint, vector = self._signature(query, namespace)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (fingerprint, vector, value)
+            for band, buckets in enumerate(self._bands):
+                buckets.setdefault((namespace, self._band(fingerprint, band)), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _signature(self, query, namespace):
+        tokens = canonical_tokens(query)
+        key = (namespace, " ".join(tokens))
+        vector = self.embedder.encode([key[1]])[0] if self.embedder else None
+        return key, simhash(shingles(tokens)), vector
+
+    def _find_neighbour(self, namespace, fingerprint, vector):
+        if vector is not None:
+            best_key, best_score = None, self.similarity
+            for key, (_, cached_vector, _) in self._entries.items():
+                if key[0] == namespace:
+                    score = float(cached_vector @ vector)
+                    if score >= best_score:
+                        best_key, best_score = key, score
+            return best_key
+
+        candidates = set()
+        for band, buckets in enumerate(self._bands):
+            candidates |= buckets.get((namespace, self._band(fingerprint, band)), set())
+        best_key, best_distance = None, self.max_distance + 1
+        for key in candidates:
+            distance = bin(self._entries[key][0] ^ fingerprint).count('1')
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _band(self, fingerprint, band):
+        return fingerprint >> (band * self.BAND_BITS) & ((1 << self.BAND_BITS) - 1)
+
+    def _remove(self, key):
+        fingerprint = self._entries.pop(key)[0]
+        for band, buckets in enumerate(self._bands):
+            bucket_key = (key[0], self._band(fingerprint, band))
+            bucket = buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[bucket_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for buckets in self._bands:
+                buckets.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'near_duplicate_hits': self.near_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class SemanticCachedRAG:
+    """Drop-in wrapper that serves repeated or rephrased requests from a SemanticQueryCache"""
+
+    def __init__(self, rag, cache=None):
+        self.rag = rag
+        self.cache = cache if cache is not None else SemanticQueryCache()
+
+    def generate_doc(self, query):
+        document = self.cache.get(query, 'generate_doc')
+        if document is None:
+            document = self.rag.generate_doc(query)
+            self.cache.put(query, document, 'generate_doc')
+        return document
+
+    def query_documents(self, query):
+        result = self.cache.get(query, 'query_documents')
+        if result is None:
+            result = self.rag.query_documents(query)
+            self.cache.put(query, result, 'query_documents')
+        return result
+
+    def query_legal_documents(self, query):
+        return self.query_documents(query)
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
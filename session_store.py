@@ -0,0 +1,161 @@
+# session_store.py
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+DEFAULT_SESSION = 'default'
+
+
+def _sizeof(value):
+    """Rough deep size of the plain containers kept in a session"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(key) + _sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+
+class Session:
+    """One user's recent turns (a ring buffer) and free-form context"""
+
+    def __init__(self, session_id, max_turns, now):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.context = {}
+        self.created = now
+        self.last_seen = now
+        self.turn_bytes = 0
+        self.context_bytes = 0
+
+    @property
+    def nbytes(self):
+        return self.turn_bytes + self.context_bytes
+
+
+class SessionStore:
+    """Per-session conversation state with bounded memory.
+
+    Each session keeps at most ``max_turns`` turns (responses truncated to
+    ``max_response_chars``).  Sessions idle for longer than ``ttl`` seconds
+    are dropped, and least-recently-used sessions are evicted whenever there
+    are more than ``max_sessions`` or the accounted size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_sessions=10000, max_turns=20, ttl=30 * 60,
+                 max_bytes=64 * 1024 * 1024, max_response_chars=2000, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_response_chars = max_response_chars
+        self.clock = clock
+        self.current_bytes = 0
+        self.expired = 0
+        self.evicted = 0
+        self._sessions = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, session_id=DEFAULT_SESSION):
+        """The session for ``session_id``, created on first use"""
+        with self._lock:
+            session = self._touch(session_id)
+            self._evict(keep=session_id)
+            return session
+
+    def history(self, session_id=DEFAULT_SESSION):
+        return self.get(session_id).turns
+
+    def context(self, session_id=DEFAULT_SESSION):
+        return self.get(session_id).context
+
+    def record_turn(self, session_id, query, response, intent=None):
+        turn = {
+            'query': query,
+            'intent': intent,
+            'response': response[:self.max_response_chars],
+            'timestamp': time.time()
+        }
+        size = _sizeof(turn)
+        with self._lock:
+            session = self._touch(session_id)
+            if len(session.turns) == session.turns.maxlen:
+                self._resize(session, turn_bytes=session.turn_bytes - _sizeof(session.turns[0]))
+            session.turns.append(turn)
+            self._resize(session, turn_bytes=session.turn_bytes + size)
+            self._evict(keep=session_id)
+        return turn
+
+    def update_context(self, session_id=DEFAULT_SESSION, **values):
+        """Set context keys and re-account the session's size"""
+        with self._lock:
+            session = self._touch(session_id)
+            session.context.update(values)
+            self._resize(session, context_bytes=_sizeof(session.context))
+            self._evict(keep=session_id)
+        return session.context
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self.current_bytes -= session.nbytes
+
+    def _touch(self, session_id):
+        now = self.clock()
+        session = self._sessions.get(session_id)
+        if session is not None and now - session.last_seen > self.ttl:
+            self._remove(session_id)
+            self.expired += 1
+            session = None
+        if session is None:
+            session = Session(session_id, self.max_turns, now)
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def _resize(self, session, turn_bytes=None, context_bytes=None):
+        before = session.nbytes
+        if turn_bytes is not None:
+            session.turn_bytes = turn_bytes
+        if context_bytes is not None:
+            session.context_bytes = context_bytes
+        self.current_bytes += session.nbytes - before
+
+    def _evict(self, keep):
+        now = self.clock()
+        # Idle sessions sit at the front, so expiry stops at the first live one
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep or now - session.last_seen <= self.ttl:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+        while len(self._sessions) > self.max_sessions or self.current_bytes > self.max_bytes:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._remove(session_id)
+            self.evicted += 1
+
+    def _remove(self, session_id):
+        self.current_bytes -= self._sessions.pop(session_id).nbytes
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def stats(self):
+        return {
+            'sessions': len(self._sessions),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
@@ -0,0 +1,87 @@
+# singleflight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from async_rag import LoopLocal
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is
+    still running block and receive the same result (or exception).  Once
+    it finishes the key is released, so later calls compute afresh.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def _release(self, key):
+        with self._lock:
+            del self._inflight[key]
+
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._inflight)}
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: one task per key, awaited by every concurrent caller.
+
+    Waiters await the shared task through ``asyncio.shield``, so one caller
+    timing out or being cancelled does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._tasks = LoopLocal(dict)  # key -> task, per event loop
+
+    async def do(self, key, fn, *args):
+        tasks = self._tasks.get()
+        task = tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(tasks, key, done))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _forget(tasks, key, task):
+        if tasks.get(key) is task:
+            del tasks[key]
+        if not task.cancelled():
+            task.exception()  # every waiter may have given up; don't log it as unretrieved
+
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared,
+                'in_flight': sum(len(tasks) for tasks in self._tasks.values())}
@@ -0,0 +1,46 @@
+# test_answer_index.py
+import random
+
+import pytest
+
+from rag_bounded import AnswerIndex
+
+WORDS = ["alpha", "beta", "confidential", "agreement", "délta", "§5", "party"]
+
+
+@pytest.fixture(scope='module')
+def texts():
+    rng = random.Random(1)
+    return [" ".join(rng.choice(WORDS) + str(rng.randint(0, 30)) for _ in range(40)) for _ in range(1500)]
+
+
+@pytest.mark.parametrize("compact_pairs", [1 << 20, 500])
+def test_matches_substring_scan_with_pending_and_compacted_postings(texts, compact_pairs):
+    index = AnswerIndex(compact_pairs=compact_pairs)
+    for doc_id, text in enumerate(texts[:1000]):
+        index.add(doc_id, text)
+    index.compact()
+    for doc_id, text in enumerate(texts[1000:], 1000):
+        index.add(doc_id, text)  # some of these stay pending
+
+    for word in ["alpha", "ta1", "délta2", "§5", "confidential30", "zzz", "a", "1"]:
+        expected = frozenset(doc_id for doc_id, text in enumerate(texts) if word in text.lower())
+        assert index.docs_containing(word) == expected, word
+
+
+def test_postings_widen_past_two_byte_ids():
+    index = AnswerIndex()
+    for doc_id in range(70000):
+        index.add(doc_id, f"common rare{doc_id}")
+    index.compact()
+    assert index.docs_containing("rare69999") == {69999}
+    assert len(index.docs_containing("common")) == 70000
+
+
+def test_compacting_shrinks_the_index(texts):
+    index = AnswerIndex()
+    for doc_id, text in enumerate(texts):
+        index.add(doc_id, text)
+    before = index.memory_usage()
+    index.compact()
+    assert index.memory_usage() < before / 2
@@ -0,0 +1,66 @@
+# test_lazy_rag.py
+import asyncio
+import time
+
+from generation_cache import GenerationCache
+from main import LazyRAG, LegalAISystem
+
+
+class SlowPipeline:
+    config = {'base_model_name_or_path': 'test'}
+    documents = []
+
+    def generate_doc(self, query):
+        return f"**LEGAL DOCUMENT: {query}**\n\nTerms and conditions."
+
+    def query_documents(self, query):
+        return {'relevant_docs': [], 'answer': ''}
+
+
+def slow_loader(delay):
+    def load():
+        time.sleep(delay)
+        return SlowPipeline()
+    return load
+
+
+def run_generation_then_calculation(legal_ai):
+    """Start a generation, then a calculation 50 ms later on the same loop; seconds until each finished"""
+    async def timed(query, start):
+        await legal_ai.process_request_async(query)
+        return time.perf_counter() - start
+
+    async def scenario():
+        start = time.perf_counter()
+        generation = asyncio.ensure_future(timed("generate an nda", start))
+        await asyncio.sleep(0.05)
+        calculation = await timed("calculate 15% of 2000", start)
+        return await generation, calculation
+
+    return asyncio.run(scenario())
+
+
+def test_calculation_is_not_blocked_by_a_loading_pipeline():
+    legal_ai = LegalAISystem(LazyRAG(slow_loader(1.0)))
+    generation, calculation = run_generation_then_calculation(legal_ai)
+    assert calculation < 0.5
+    assert generation >= 1.0
+
+
+def test_calculation_is_not_blocked_behind_the_generation_cache(tmp_path):
+    cache = GenerationCache(str(tmp_path / 'generations.sqlite'))
+    legal_ai = LegalAISystem(LazyRAG(slow_loader(1.0)), generation_cache=cache)
+    generation, calculation = run_generation_then_calculation(legal_ai)
+    assert calculation < 0.5
+    assert generation >= 1.0
+    cache.close()
+
+
+def test_wait_async_returns_the_pipeline_or_fallback():
+    async def scenario():
+        loaded = await LazyRAG(slow_loader(0.01)).wait_async()
+        fallback = await LazyRAG(lambda: None, fallback='mock').wait_async()
+        return loaded, fallback
+
+    loaded, fallback = asyncio.run(scenario())
+    assert isinstance(loaded, SlowPipeline) and fallback == 'mock'
@@ -0,0 +1,53 @@
+# test_legal_agent.py
+from legal_agent import LegalAgent
+
+
+class RecordingPipeline:
+    """Every document matches; remembers the queries it was asked to search and re-rank"""
+
+    def __init__(self):
+        self.searches = []
+        self.reranks = []
+
+    def query_documents(self, query):
+        self.searches.append(query)
+        docs = [{'doc_id': doc_id, 'name': f'NDA {doc_id}', 'type': 'NDA', 'score': 0.9} for doc_id in range(3)]
+        return {'query': query, 'relevant_docs': docs, 'candidates': [(doc_id, 0.9) for doc_id in range(3)]}
+
+    def rerank_documents(self, query, doc_ids):
+        self.reranks.append(query)
+        docs = [{'doc_id': doc_id, 'name': f'NDA {doc_id}', 'type': 'NDA', 'score': 0.8} for doc_id in doc_ids]
+        return {'query': query, 'relevant_docs': docs, 'candidates': [(doc_id, 0.8) for doc_id in doc_ids]}
+
+    def generate_doc(self, query):
+        return query
+
+
+def test_chained_follow_ups_keep_the_original_anchor():
+    rag = RecordingPipeline()
+    agent = LegalAgent(rag)
+    agent.retrieve("mutual nda for software development", session_id='alice')
+    agent.retrieve("add that non-solicitation clause", session_id='alice')
+    agent.retrieve("make it also cover freelancers", session_id='alice')
+    agent.retrieve("now add a governing law clause too", session_id='alice')
+
+    assert rag.searches == ["mutual nda for software development"]
+    assert rag.reranks == [
+        "mutual nda for software development add that non-solicitation clause",
+        "mutual nda for software development make it also cover freelancers",
+        "mutual nda for software development now add a governing law clause too",
+    ]
+    last = agent.sessions.context('alice')['last_retrieval']
+    assert last['query'] == "mutual nda for software development"
+
+
+def test_new_standalone_query_becomes_the_anchor():
+    rag = RecordingPipeline()
+    agent = LegalAgent(rag)
+    agent.retrieve("mutual nda", session_id='bob')
+    agent.retrieve("add that clause", session_id='bob')
+    agent.retrieve("employment contract for engineers", session_id='bob')
+    agent.retrieve("add that clause", session_id='bob')
+
+    assert rag.searches == ["mutual nda", "employment contract for engineers"]
+    assert rag.reranks[-1] == "employment contract for engineers add that clause"
@@ -0,0 +1,116 @@
+# test_legal_calculator_bulk.py
+import io
+import math
+import random
+import re
+
+import numpy as np
+import pytest
+
+from legal_calculator import LegalCalculator
+from legal_calculator_bulk import BulkLegalCalculator
+
+
+def amount(label, text):
+    """Dollar figure following ``label`` in a LegalCalculator response (rounded to cents, hence abs=0.01)"""
+    match = re.search(re.escape(label) + r"\s*\$([\d,]+\.\d\d)", text)
+    assert match, (label, text)
+    return float(match.group(1).replace(',', ''))
+
+
+@pytest.fixture(scope='module')
+def rows():
+    rng = random.Random(0)
+    return [
+        {
+            'rent': rng.randint(300, 9000),
+            'days_late': rng.randint(1, 60),
+            'rate': rng.randint(1, 20),
+            'amount': round(rng.uniform(10, 100000), 2),
+            'base_amount': round(rng.uniform(10, 100000), 2),
+        }
+        for _ in range(200)
+    ]
+
+
+@pytest.fixture(scope='module')
+def bulk_results(rows):
+    columns = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+    return BulkLegalCalculator().calculate(columns)
+
+
+def test_late_fees_match_legal_calculator(rows, bulk_results):
+    calculator = LegalCalculator()
+    for i, row in enumerate(rows):
+        text = calculator.calculate(f"late fee for rent {row['rent']} paid {row['days_late']} days late at {row['rate']}%")
+        assert amount("Daily Late Fee:", text) == pytest.approx(bulk_results['late_fee_daily'][i], abs=0.01)
+        assert amount("Total Late Fee:", text) == pytest.approx(bulk_results['late_fee_total'][i], abs=0.01)
+
+
+def test_percentages_match_legal_calculator(rows, bulk_results):
+    calculator = LegalCalculator()
+    for i, row in enumerate(rows):
+        text = calculator.calculate(f"{row['rate']}% of {row['amount']}")
+        assert amount("Result:", text) == pytest.approx(bulk_results['percentage_result'][i], abs=0.01)
+
+
+def test_damages_match_legal_calculator(rows, bulk_results):
+    calculator = LegalCalculator()
+    for i, row in enumerate(rows):
+        text = calculator.calculate(f"damages on {row['base_amount']}")
+        assert amount("Estimated Damages (1.5x):", text) == pytest.approx(bulk_results['damages'][i], abs=0.01)
+        assert amount("Total Potential Award:", text) == pytest.approx(bulk_results['total_award'][i], abs=0.01)
+
+
+def test_late_fee_rate_defaults_to_five_percent():
+    fees = BulkLegalCalculator().calculate({'rent': [3000], 'days_late': [10]})
+    text = LegalCalculator().calculate("late fee for rent 3000 paid 10 days late")
+    assert amount("Total Late Fee:", text) == pytest.approx(fees['late_fee_total'][0], abs=0.01)
+
+
+def test_csv_chunks_match_in_memory_results(rows, bulk_results):
+    names = list(rows[0])
+    text = ",".join(names) + "\n" + "".join(",".join(str(row[name]) for name in names) + "\n" for row in rows)
+
+    chunks = list(BulkLegalCalculator().process_csv(io.StringIO(text), chunk_rows=64))
+    assert [len(chunk['damages']) for chunk in chunks] == [64, 64, 64, 8]
+    for name, values in bulk_results.items():
+        np.testing.assert_allclose(np.concatenate([chunk[name] for chunk in chunks]), values)
+
+    totals = BulkLegalCalculator().portfolio_totals(io.StringIO(text), chunk_rows=64)
+    assert totals['rows'] == len(rows)
+    assert totals['total_award'] == pytest.approx(float(bulk_results['total_award'].sum()))
+
+
+def test_csv_blank_cells_become_nan_and_unknown_columns_are_ignored():
+    text = "client,rent,days_late,base_amount\nacme,1500,10,\nbeta,,5,2000\n"
+    chunk = next(BulkLegalCalculator().process_csv(io.StringIO(text)))
+    assert chunk['late_fee_total'][0] == pytest.approx(25.0)
+    assert math.isnan(chunk['late_fee_total'][1])
+    assert math.isnan(chunk['damages'][0]) and chunk['damages'][1] == pytest.approx(3000.0)
+
+    totals = BulkLegalCalculator().portfolio_totals(io.StringIO(text))
+    assert totals['rows'] == 2 and totals['total_award'] == pytest.approx(5000.0)
+
+
+def test_csv_quoted_delimiters_stay_in_their_cell():
+    text = 'client,rent,days_late,base_amount\n"Acme, Inc",1500,10,100\nbeta,n/a,5,2000\n'
+    chunk = next(BulkLegalCalculator().process_csv(io.StringIO(text)))
+    np.testing.assert_allclose(chunk['damages'], [150.0, 3000.0])
+    assert chunk['late_fee_total'][0] == pytest.approx(25.0)
+    assert math.isnan(chunk['late_fee_total'][1])
+
+
+def test_csv_short_rows_are_padded_not_dropped():
+    text = "rent,days_late,base_amount\n1500,10,100\n3000\n1200,6,50\n"
+    chunks = list(BulkLegalCalculator().process_csv(io.StringIO(text), chunk_rows=2))
+    damages = np.concatenate([chunk['damages'] for chunk in chunks])
+    fees = np.concatenate([chunk['late_fee_total'] for chunk in chunks])
+    assert len(damages) == 3
+    assert damages[0] == pytest.approx(150.0) and math.isnan(damages[1]) and damages[2] == pytest.approx(75.0)
+    assert math.isnan(fees[1]) and fees[2] == pytest.approx(12.0)
+
+
+def test_csv_without_known_columns_is_rejected():
+    with pytest.raises(ValueError):
+        list(BulkLegalCalculator().read_csv(io.StringIO("client,notes\nacme,x\n")))
@@ -0,0 +1,142 @@
+# test_scheduler.py
+import asyncio
+import threading
+
+import pytest
+
+from scheduler import COMPLEXITY_RANK, AgingQueue, ComplexityScheduler, OverloadedError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = ComplexityScheduler(fast_workers=2, heavy_workers=1, max_fast_queue=4, max_heavy_queue=4)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def block_heavy_lane(scheduler):
+    """Occupy the only heavy worker until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit('document_generation', 'high', hold)
+    assert started.wait(5)
+    return release, future
+
+
+def test_lanes_follow_intent():
+    assert ComplexityScheduler.lane_for('calculation') == 'fast'
+    assert ComplexityScheduler.lane_for('analysis') == 'fast'
+    assert ComplexityScheduler.lane_for('document_generation') == 'heavy'
+    assert ComplexityScheduler.lane_for('general_query') == 'heavy'
+
+
+def test_fast_lane_does_not_wait_behind_generation(scheduler):
+    release, blocker = block_heavy_lane(scheduler)
+    try:
+        assert scheduler.run('calculation', 'low', lambda: 42) == 42
+        assert not blocker.done()
+    finally:
+        release.set()
+    blocker.result(5)
+
+
+def test_heavy_queue_serves_low_complexity_first(scheduler):
+    order = []
+    release, blocker = block_heavy_lane(scheduler)
+    futures = [scheduler.submit('document_generation', complexity, order.append, complexity)
+               for complexity in ('high', 'medium', 'low')]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(5)
+    assert order == ['low', 'medium', 'high']
+
+
+def test_waiting_high_complexity_work_is_not_starved():
+    clock = FakeClock()
+    jobs = AgingQueue(len(COMPLEXITY_RANK), age_step=2.0, clock=clock)
+    jobs.put(COMPLEXITY_RANK['high'], 'high')
+    # A steady stream of cheap work arriving after it
+    for second in range(1, 7):
+        clock.now = second
+        jobs.put(COMPLEXITY_RANK['low'], f'low-{second}')
+
+    # Two levels above low, the high job waits 2 * age_step at most, then goes before newer low work
+    order = [jobs.get() for _ in range(7)]
+    assert order == ['low-1', 'low-2', 'low-3', 'high', 'low-4', 'low-5', 'low-6']
+
+
+def test_queue_without_aging_is_strict_and_close_drains_first():
+    jobs = AgingQueue(len(COMPLEXITY_RANK), age_step=None)
+    for complexity in ('high', 'medium', 'low', 'low'):
+        jobs.put(COMPLEXITY_RANK[complexity], complexity)
+    jobs.close()
+    assert [jobs.get() for _ in range(5)] == ['low', 'low', 'medium', 'high', None]
+
+
+def test_full_lane_rejects_with_429(scheduler):
+    release, blocker = block_heavy_lane(scheduler)
+    try:
+        queued = [scheduler.submit('document_generation', 'low', lambda: None) for _ in range(3)]
+        with pytest.raises(OverloadedError) as excinfo:
+            scheduler.submit('document_generation', 'low', lambda: None)
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.lane == 'heavy' and excinfo.value.depth == 4
+
+        # The fast lane has its own budget
+        assert scheduler.run('calculation', 'low', lambda: 'ok') == 'ok'
+    finally:
+        release.set()
+    for future in [blocker] + queued:
+        future.result(5)
+
+    stats = scheduler.stats()['heavy']
+    assert stats['rejected'] == 1 and stats['pending'] == 0 and stats['completed'] == 4
+    # Capacity comes back once the queue drains
+    assert scheduler.run('document_generation', 'low', lambda: 'again') == 'again'
+
+
+def test_errors_propagate_and_release_the_slot(scheduler):
+    def fail():
+        raise ValueError("generation failed")
+
+    with pytest.raises(ValueError, match="generation failed"):
+        scheduler.run('document_generation', 'medium', fail)
+    assert scheduler.stats()['heavy']['pending'] == 0
+
+
+def test_run_async_limits_heavy_concurrency_and_rejects_overflow(scheduler):
+    running = 0
+    peak = 0
+
+    async def generate():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return 'document'
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(scheduler.run_async('document_generation', 'low', generate) for _ in range(5)),
+            return_exceptions=True
+        )
+        return results
+
+    results = asyncio.run(scenario())
+    assert results.count('document') == 4
+    assert [type(result) for result in results if result != 'document'] == [OverloadedError]
+    assert peak == 1
+    assert scheduler.stats()['heavy']['pending'] == 0
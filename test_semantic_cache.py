@@ -0,0 +1,32 @@
+# test_semantic_cache.py
+from semantic_cache import SemanticQueryCache, canonical_tokens
+
+
+def test_canonical_tokens_keep_word_order():
+    assert canonical_tokens("One-way NDA where Acme discloses to Beta") == \
+        ['unilateral', 'nda', 'where', 'acme', 'discloses', 'beta']
+
+
+def test_rephrased_request_hits():
+    cache = SemanticQueryCache()
+    cache.put("Please draft a non-disclosure agreement for me", "nda")
+    assert cache.get("nda") == "nda"
+    assert cache.get("Generate an NDA.") == "nda"
+
+
+def test_swapped_parties_miss():
+    cache = SemanticQueryCache()
+    cache.put("one-way NDA where Acme discloses to Beta", "acme discloses")
+    cache.put("employment contract where Acme employs John Smith", "acme employs")
+
+    assert cache.get("one-way NDA where Beta discloses to Acme") is None
+    assert cache.get("employment contract where John Smith employs Acme") is None
+    assert cache.get("one way NDA where Acme discloses to Beta") == "acme discloses"
+    assert cache.stats()['misses'] == 2
+
+
+def test_namespaces_are_separate():
+    cache = SemanticQueryCache()
+    cache.put("mutual nda", "document", namespace='generate_doc')
+    assert cache.get("mutual nda", namespace='query_documents') is None
+    assert cache.get("mutual nda", namespace='generate_doc') == "document"
@@ -0,0 +1,70 @@
+# test_session_store.py
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_turns_are_a_ring_buffer_with_truncated_responses():
+    store = SessionStore(max_turns=3, max_response_chars=10)
+    for i in range(5):
+        store.record_turn('alice', f"query {i}", "x" * 50)
+    turns = store.history('alice')
+    assert [turn['query'] for turn in turns] == ['query 2', 'query 3', 'query 4']
+    assert all(len(turn['response']) == 10 for turn in turns)
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(max_sessions=2)
+    store.record_turn('alice', "q", "r")
+    store.record_turn('bob', "q", "r")
+    store.get('alice')  # bob is now the least recently used
+    store.record_turn('carol', "q", "r")
+    assert 'alice' in store and 'carol' in store
+    assert 'bob' not in store
+    assert store.stats()['evicted'] == 1
+
+
+def test_idle_sessions_expire_after_ttl():
+    clock = FakeClock()
+    store = SessionStore(ttl=60, clock=clock)
+    store.record_turn('alice', "q", "r")
+    clock.now = 30
+    store.record_turn('bob', "q", "r")
+
+    clock.now = 61  # alice idle for 61s, bob for 31s
+    store.get('carol')
+    assert 'alice' not in store and 'bob' in store
+    assert store.stats()['expired'] == 1
+
+    clock.now = 200
+    assert len(store.history('bob')) == 0  # expired on access: a fresh, empty session
+    assert 'carol' not in store
+    assert store.stats()['expired'] == 3
+
+
+def test_byte_cap_evicts_oldest_sessions_but_keeps_the_active_one():
+    store = SessionStore(max_bytes=4000, max_response_chars=2000)
+    for user in ('alice', 'bob', 'carol'):
+        store.record_turn(user, "q", "x" * 1500)
+    assert store.current_bytes <= store.max_bytes
+    assert 'carol' in store and 'alice' not in store
+
+    # A single session larger than the cap is kept rather than evicting itself
+    store.update_context('carol', notes="y" * 10000)
+    assert 'carol' in store and len(store) == 1
+
+
+def test_byte_accounting_returns_to_zero():
+    store = SessionStore(max_turns=2)
+    for i in range(4):
+        store.record_turn('alice', f"q{i}", "r" * 100)
+    store.update_context('alice', party="Acme")
+    assert store.current_bytes > 0
+    store.drop('alice')
+    assert store.current_bytes == 0 and len(store) == 0
@@ -0,0 +1,146 @@
+# test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, count, fn):
+    """``count`` threads calling flight.do('key', fn); returns (results, errors) once all finish"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do('key', fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def generate():
+        executions.append(1)
+        release.wait(5)
+        return "document"
+
+    threads, results, errors = run_concurrently(flight, 8, generate)
+    wait_for(lambda: flight.stats()['shared'] == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["document"] * 8 and not errors
+    assert len(executions) == 1
+    assert flight.stats() == {'calls': 1, 'shared': 7, 'in_flight': 0}
+
+
+def test_error_reaches_every_waiter_and_releases_the_key():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("generation failed")
+
+    threads, results, errors = run_concurrently(flight, 4, fail)
+    wait_for(lambda: flight.stats()['shared'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    # The failure is not cached: the next call runs again
+    assert flight.do('key', lambda: "retry") == "retry"
+    assert flight.stats()['calls'] == 2
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert [flight.do('key', lambda i=i: i) for i in range(3)] == [0, 1, 2]
+    assert flight.stats()['shared'] == 0
+
+
+def test_async_calls_share_one_task_and_errors():
+    flight = AsyncSingleFlight()
+    executions = []
+
+    async def generate(value):
+        executions.append(value)
+        await asyncio.sleep(0.01)
+        if value == 'bad':
+            raise ValueError("generation failed")
+        return value.upper()
+
+    async def scenario():
+        good = await asyncio.gather(*(flight.do('nda', generate, 'nda') for _ in range(5)))
+        bad = await asyncio.gather(*(flight.do('bad', generate, 'bad') for _ in range(3)),
+                                   return_exceptions=True)
+        return good, bad
+
+    good, bad = asyncio.run(scenario())
+    assert good == ['NDA'] * 5
+    assert len(bad) == 3 and all(isinstance(e, ValueError) for e in bad)
+    assert executions == ['nda', 'bad']
+    assert flight.stats() == {'calls': 2, 'shared': 6, 'in_flight': 0}
+
+
+def test_async_cancelled_waiter_does_not_cancel_the_shared_task():
+    flight = AsyncSingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        return "document"
+
+    async def scenario():
+        impatient = asyncio.ensure_future(flight.do('key', generate))
+        patient = asyncio.ensure_future(flight.do('key', generate))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(scenario()) == "document"
+
+
+def test_async_flights_on_different_loops_do_not_mix():
+    flight = AsyncSingleFlight()
+    both_running = threading.Barrier(2)
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        return "document"
+
+    async def call():
+        both_running.wait(5)
+        return await flight.do('key', generate)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(call()))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # Overlapping calls on two loops each run their own task instead of awaiting the other loop's
+    assert results == ["document", "document"]
+    assert flight.stats() == {'calls': 2, 'shared': 0, 'in_flight': 0}
@@ -0,0 +1,167 @@
+# vector_quant.py
+import numpy as np
+
+
+class Int8Quantizer:
+    """Per-dimension scalar quantization of float32 vectors to one byte each (4x smaller)"""
+
+    def fit(self, vectors):
+        self.low = vectors.min(axis=0).astype(np.float32)
+        high = vectors.max(axis=0).astype(np.float32)
+        self.scale = np.maximum((high - self.low) / 255.0, 1e-12).astype(np.float32)
+        return self
+
+    def encode(self, vectors):
+        codes = np.rint((vectors - self.low) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes):
+        return (codes.astype(np.float32) + 128) * self.scale + self.low
+
+    def scores(self, query, codes):
+        """Asymmetric inner products: float query against int8 codes, never decoding the matrix"""
+        weighted = query * self.scale
+        offset = float(np.dot(query, self.low) + 128 * weighted.sum())
+        return codes.astype(np.float32) @ weighted + offset
+
+    @property
+    def nbytes(self):
+        return self.low.nbytes + self.scale.nbytes
+
+
+class ProductQuantizer:
+    """Product quantization: ``m`` sub-vectors, each replaced by one of 256 centroids (one byte)"""
+
+    def __init__(self, m=16, ksub=256, iterations=20, seed=0):
+        self.m = m
+        self.ksub = ksub
+        self.iterations = iterations
+        self.seed = seed
+
+    def fit(self, vectors):
+        n, dim = vectors.shape
+        if dim % self.m:
+            raise ValueError(f"Vector dimension {dim} is not divisible by m={self.m}")
+        self.dsub = dim // self.m
+        ksub = min(self.ksub, n)
+        rng = np.random.default_rng(self.seed)
+
+        self.centroids = np.empty((self.m, ksub, self.dsub), dtype=np.float32)
+        for j in range(self.m):
+            self.centroids[j] = _kmeans(self._sub(vectors, j), ksub, self.iterations, rng)
+        return self
+
+    def encode(self, vectors, batch_size=8192):
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start:start + batch_size]
+            for j in range(self.m):
+                codes[start:start + len(batch), j] = _nearest(self._sub(batch, j), self.centroids[j])
+        return codes
+
+    def decode(self, codes):
+        return np.concatenate([self.centroids[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def scores(self, query, codes):
+        """Asymmetric distance computation through one (m x ksub) lookup table per query"""
+        table = np.einsum('jkd,jd->jk', self.centroids, query.reshape(self.m, self.dsub))
+        return table[np.arange(self.m), codes].sum(axis=1)
+
+    def _sub(self, vectors, j):
+        return vectors[:, j * self.dsub:(j + 1) * self.dsub]
+
+    @property
+    def nbytes(self):
+        return self.centroids.nbytes
+
+
+def _nearest(points, centroids):
+    # argmin ||p - c||^2 == argmin (||c||^2 - 2 p.c)
+    distances = (centroids * centroids).sum(axis=1) - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(points, k, iterations, rng):
+    centroids = points[rng.choice(len(points), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = _nearest(points, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class QuantizedVectorIndex:
+    """Inner-product index over int8 or PQ codes with optional exact re-ranking.
+
+    ``full_vectors`` (an array, or a path for an on-disk ``np.memmap``) is
+    only touched for the re-ranked shortlist, so keeping it on disk
+    preserves the memory saving while restoring most of the recall.
+    """
+
+    def __init__(self, vectors, encoding='int8', full_vectors=None, **pq_options):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.dim = vectors.shape[1]
+        self.encoding = encoding
+
+        if encoding == 'int8':
+            self.quantizer = Int8Quantizer().fit(vectors)
+        elif encoding == 'pq':
+            self.quantizer = ProductQuantizer(**pq_options).fit(vectors)
+        else:
+            raise ValueError(f"Unknown encoding '{encoding}' (use 'int8' or 'pq')")
+        self.codes = self.quantizer.encode(vectors)
+
+        if isinstance(full_vectors, str):
+            stored = np.lib.format.open_memmap(full_vectors, mode='w+', dtype=np.float32, shape=vectors.shape)
+            stored[:] = vectors
+            stored.flush()
+            full_vectors = np.load(full_vectors, mmap_mode='r')
+        self.full_vectors = full_vectors
+
+    def __len__(self):
+        return len(self.codes)
+
+    def search(self, query, k=10, rerank=0):
+        """Top-``k`` ids and scores; ``rerank`` > k re-scores that many candidates exactly"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        scores = self.quantizer.scores(query, self.codes)
+
+        shortlist = max(k, rerank) if self.full_vectors is not None and rerank else k
+        ids = _top(scores, shortlist)
+
+        if shortlist > k:
+            exact = np.asarray(self.full_vectors[np.sort(ids)]) @ query
+            ids = np.sort(ids)
+            order = np.argsort(-exact, kind='stable')[:k]
+            return ids[order], exact[order]
+        return ids, scores[ids]
+
+    def memory_usage(self):
+        in_memory_full = isinstance(self.full_vectors, np.ndarray) and not isinstance(self.full_vectors, np.memmap)
+        return {
+            'codes_bytes': self.codes.nbytes,
+            'quantizer_bytes': self.quantizer.nbytes,
+            'full_vectors_bytes': self.full_vectors.nbytes if in_memory_full else 0,
+            'float32_equivalent_bytes': len(self.codes) * self.dim * 4
+        }
+
+
+def _top(scores, k):
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    ids = np.argpartition(-scores, k - 1)[:k]
+    return ids[np.argsort(-scores[ids], kind='stable')]
+
+
+def load_faiss_vectors(path):
+    """Recover the stored float32 vectors from a FAISS index file (needs ``faiss`` installed)"""
+    try:
+        import faiss
+    except ImportError:
+        raise ImportError("faiss is required to read legal_faiss.index (pip install faiss-cpu)")
+    index = faiss.read_index(path)
+    return index.reconstruct_n(0, index.ntotal)